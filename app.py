@@ -1,179 +1,396 @@
 """
 Terminal Veil - Web Edition (Async)
 Works on iPhone, Android, and Desktop browsers
+
+This module is an ASGI application: serve it with any ASGI server, e.g.
+    hypercorn app:app --bind 0.0.0.0:5495
+    uvicorn app:app --host 0.0.0.0 --port 5495
+Request bodies are read without blocking the event loop, and all OpenCV
+work runs on a bounded, prioritized scan queue that sheds load with 429s.
 """
 import asyncio
-import base64
-import io
+import json
 from datetime import datetime
 
-import cv2
-import numpy as np
-from PIL import Image
-from flask import Flask, jsonify, render_template, request
+from quart import Quart, Response, g, jsonify, make_response, request
 
 # Import your existing game files
 from terminalveil.terminal import GameEngine
+from terminalveil.analytics import default_analytics
+from terminalveil import export
 from terminalveil.camera_handler import CameraAnalyzer
+from terminalveil.save_manager import SaveManager, default_store
+from terminalveil.save_writer import SaveWriter
+from terminalveil.sessions import Session, SessionStore
+from terminalveil.scanning import decode_data_url, scan_job_starter, scan_outcome, submit_scan
+from terminalveil.jobs import Job, JobStore, sse_event
+from terminalveil.web_assets import WebAssets
+from terminalveil.admission import Backpressure, ScanQueue
+from terminalveil.ratelimit import Budget, RateLimiter
+from terminalveil.metrics import metrics
+from terminalveil import config
+
+app = Quart(__name__, static_folder=None)  # /assets serves static/ under hashed names
+if config.PROXY_HOPS:
+    # Behind a reverse proxy remote_addr is the proxy; trust its X-Forwarded-For
+    from hypercorn.middleware import ProxyFixMiddleware
+    app.asgi_app = ProxyFixMiddleware(app.asgi_app, mode='legacy', trusted_hops=config.PROXY_HOPS)
+
+# Phone photos are a few MB; give slow mobile uploads time to arrive
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+app.config['BODY_TIMEOUT'] = 120
+
+SESSION_MAX_AGE = 604800  # One week, matches the cookie lifetime
+CLEANUP_INTERVAL = 3600  # Seconds between idle-session sweeps
+JOB_POLL_TIMEOUT = 25  # Longest a long-poll may hold the connection
+SSE_KEEPALIVE = 15
+
+# Saves are written behind the request, coalesced per session
+save_writer = SaveWriter(default_store())
+
+
+def new_engine(session_id: str, fresh: bool) -> GameEngine:
+    """Each browser saves to its own slot, never the shared local save."""
+    return GameEngine(save_manager=SaveManager(slot=session_id, writer=save_writer, fresh=fresh))
+
+
+# Store games for each player, sharded and keyed by random session IDs;
+# a cookie whose game is still saved gets it back after a restart
+sessions = SessionStore(new_engine, CameraAnalyzer, max_idle=SESSION_MAX_AGE,
+                        restorable=save_writer.has_slot)
+
+# OpenCV work runs on config.CV_WORKERS threads behind a bounded queue
+scan_queue = ScanQueue(
+    config.CV_WORKERS,
+    config.SCAN_QUEUE_DEPTH,
+    degrade_depth=config.DEGRADE_DEPTH if config.DEGRADE_SCANS else None
+)
+scan_budget = Budget(
+    'scan',
+    RateLimiter(config.SCAN_BUDGET, config.SCAN_REFILL),
+    RateLimiter(config.IP_SCAN_BUDGET, config.IP_SCAN_REFILL)
+)
+command_budget = Budget('command', RateLimiter(config.COMMAND_BUDGET, config.COMMAND_REFILL))
+
+# Scans submitted through the job API, idempotent on client request IDs
+jobs = JobStore()
+
+# The page and its CSS/JS, rendered and compressed once at startup
+web_assets = WebAssets()
+
+
+def scan_charger(session: Session):
+    """Bill this request's session and IP for a scan's estimated cost."""
+    client_ip = request.remote_addr
+    return lambda cost: scan_budget.charge(session.id, client_ip, cost)
 
-app = Flask(__name__)
 
-# Store games for each player (simple version)
-games = {}
-analyzers = {}
+async def get_or_create_session() -> Session:
+    """Session for this request's cookie; unknown/expired cookies get a new one."""
+    session_id = request.cookies.get('session_id')
+    session, created = sessions.get(session_id), False
+    if session is None:
+        # Restoring a saved session reads the save database
+        session, created = await asyncio.to_thread(sessions.get_or_create, session_id)
+    default_analytics().record_visit(session.id)
+    if created:
+        g.new_session_id = session.id
+    return session
 
 
-async def get_or_create_game(session_id: str) -> GameEngine:
-    """Async helper to get or create a game session."""
-    if session_id not in games:
-        # Simulate async initialization (e.g., database lookup)
-        await asyncio.sleep(0)
-        games[session_id] = GameEngine()
-    return games[session_id]
+@app.after_request
+async def set_session_cookie(resp):
+    """Hand newly created sessions their cookie."""
+    session_id = g.pop('new_session_id', None)
+    if session_id:
+        resp.set_cookie('session_id', session_id, max_age=SESSION_MAX_AGE,
+                        httponly=True, samesite='Lax')
+    return resp
 
 
-async def get_or_create_analyzer(session_id: str) -> CameraAnalyzer:
-    """Async helper to get or create a camera analyzer."""
-    if session_id not in analyzers:
-        await asyncio.sleep(0)
-        analyzers[session_id] = CameraAnalyzer()
-    return analyzers[session_id]
+def asset_response(asset) -> Response:
+    """A precompressed asset, or a 304 if the client's copy is current."""
+    status, body, headers = asset.respond(
+        request.headers.get('Accept-Encoding', ''),
+        request.headers.get('If-None-Match', '')
+    )
+    return Response(body, status=status, headers=headers)
 
 
 @app.route('/')
 async def index():
     """Show the game page (async version)."""
-    # Create new game instance for this browser
-    session_id = str(datetime.now().timestamp())
-    
-    # Async initialization
-    games[session_id] = GameEngine()
-    analyzers[session_id] = CameraAnalyzer()
-    
-    resp = app.make_response(render_template('index.html'))
-    resp.set_cookie('session_id', session_id)
-    return resp
+    await get_or_create_session()
+    return asset_response(web_assets.index)
+
+
+@app.route('/sw.js')
+async def service_worker():
+    """Served from the root so it controls the whole site; never cached long."""
+    return asset_response(web_assets.service_worker)
+
+
+@app.route('/assets/<name>')
+async def asset(name):
+    """CSS and JS under content-hashed names, cacheable forever."""
+    found = web_assets.get(name)
+    if found is None:
+        return jsonify({'error': 'Not found'}), 404
+    return asset_response(found)
+
+
+async def locked(session: Session, work, *args):
+    """
+    Run engine work under the session lock on a worker thread. CV threads
+    hold the same lock while applying scan results, which writes saves and
+    the leaderboard, so the event loop never waits on it.
+    """
+    def run():
+        with session.lock:
+            return work(*args)
+    return await asyncio.to_thread(run)
+
+
+def game_status(engine: GameEngine) -> dict:
+    return {
+        'level': engine.state['current_level'] + 1,
+        'inventory': len(engine.state['inventory']),
+        'victory': engine.check_victory()
+    }
+
+
+def scan_request(cmd):
+    """The client opens the camera for scan commands."""
+    return {
+        'type': 'scan_request',
+        'mode': cmd.lower().replace('scan', '').strip() or 'any'
+    }
 
 
 @app.route('/command', methods=['POST'])
 async def command():
     """Handle typed commands (async version)."""
-    session_id = request.cookies.get('session_id', 'default')
-    
-    # Get or create game asynchronously
-    engine = await get_or_create_game(session_id)
-    
-    data = request.json
+    session = await get_or_create_session()
+    engine = session.engine
+
+    data = await request.get_json()
     cmd = data.get('command', '')
-    
+
     # Handle scan command specially
     if cmd.lower().startswith('scan'):
-        return jsonify({
-            'type': 'scan_request',
-            'mode': cmd.lower().replace('scan', '').strip() or 'any'
-        })
-    
-    # Process normal command
-    # Run CPU-bound work in thread pool to avoid blocking
-    loop = asyncio.get_event_loop()
-    response = await loop.run_in_executor(None, engine.process_command, cmd)
-    
-    return jsonify({
-        'type': 'text',
-        'response': response,
-        'level': engine.state['current_level'] + 1,
-        'inventory': len(engine.state['inventory']),
-        'victory': engine.check_victory()
-    })
+        return jsonify(scan_request(cmd))
+
+    try:
+        command_budget.charge(session.id, request.remote_addr, 1)
+    except Backpressure as e:
+        return too_many_requests(e)
+
+    def run():
+        response = engine.process_command(cmd)
+        return {'type': 'text', 'response': response, **game_status(engine)}
+
+    return jsonify(await locked(session, run))
+
+
+@app.route('/batch', methods=['POST'])
+async def batch():
+    """Run a list of commands in order under one session lock."""
+    session = await get_or_create_session()
+    engine = session.engine
+
+    commands = (await request.get_json(silent=True) or {}).get('commands')
+    if not isinstance(commands, list) or not all(isinstance(cmd, str) for cmd in commands):
+        return jsonify({'error': 'commands must be a list of strings'}), 400
+    if len(commands) > config.BATCH_MAX:
+        return jsonify({'error': f"At most {config.BATCH_MAX} commands per batch"}), 400
+
+    typed = [cmd for cmd in commands if not cmd.lower().startswith('scan')]
+    if typed:
+        try:
+            command_budget.charge(session.id, request.remote_addr, len(typed))
+        except Backpressure as e:
+            return too_many_requests(e)
+
+    def run():
+        results = [
+            scan_request(cmd) if cmd.lower().startswith('scan')
+            else {'type': 'text', 'response': engine.process_command(cmd)}
+            for cmd in commands
+        ]
+        return {'results': results, **game_status(engine)}
+
+    return jsonify(await locked(session, run))
+
+
+async def process_scan(session: Session, image_bytes: bytes, mode: str, upload: bool = False) -> dict:
+    """Analyze on the scan queue, then apply the result to the game."""
+    # Reading the level takes the session lock (and may load the save) and
+    # pricing reads the image header, so admission runs off the loop too
+    future = await asyncio.to_thread(
+        submit_scan, scan_queue, session, image_bytes, mode, upload, charge=scan_charger(session)
+    )
+    result = await asyncio.wrap_future(future)
+
+    return await locked(session, scan_outcome, session.engine, result)
+
+
+def too_many_requests(e: Backpressure):
+    """Fast 429 when the scan queue is full or a budget is spent."""
+    resp = jsonify({'error': e.message, 'retry_after': e.retry_after})
+    resp.headers['Retry-After'] = str(e.retry_after)
+    return resp, 429
 
 
 @app.route('/scan', methods=['POST'])
 async def scan():
     """Process camera image (async version)."""
-    session_id = request.cookies.get('session_id', 'default')
-    
-    engine = await get_or_create_game(session_id)
-    analyzer = await get_or_create_analyzer(session_id)
-    
-    data = request.json
+    session = await get_or_create_session()
+
+    data = await request.get_json()
     image_data = data.get('image', '')
     mode = data.get('mode', 'any')
-    
+
+    if not image_data:
+        return jsonify({'error': 'No image data'})
+
+    try:
+        return jsonify(await process_scan(session, decode_data_url(image_data), mode))
+    except Backpressure as e:
+        return too_many_requests(e)
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+
+@app.route('/upload', methods=['POST'])
+async def upload():
+    """Process an uploaded image file (async version)."""
+    session = await get_or_create_session()
+
+    try:
+        files = await request.files
+        if 'file' not in files:
+            return jsonify({'error': 'No file uploaded'})
+
+        file = files['file']
+        mode = (await request.form).get('mode', 'any')
+
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'})
+
+        return jsonify(await process_scan(session, file.read(), mode, upload=True))
+    except Backpressure as e:
+        return too_many_requests(e)
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+
+def job_request_id(data) -> str:
+    """Client-chosen ID that makes a job submit safe to retry."""
+    return data.get('request_id') or request.headers.get('Idempotency-Key')
+
+
+async def submit_job(session: Session, request_id: str, image_bytes: bytes, mode: str,
+                     upload: bool = False):
+    """Create (or find) the job; starting it takes the session lock, so off the loop."""
+    starter = scan_job_starter(scan_queue, session, image_bytes, mode, upload,
+                               charge=scan_charger(session))
+    try:
+        job, _ = await asyncio.to_thread(jobs.submit, session, request_id, starter)
+    except Backpressure as e:
+        return too_many_requests(e)
+    except Exception as e:
+        return jsonify({'error': str(e)})
+    return jsonify(job.to_dict()), 202
+
+
+@app.route('/jobs/scan', methods=['POST'])
+async def submit_scan_job():
+    """Queue a camera scan and return its job ID immediately."""
+    session = await get_or_create_session()
+
+    data = await request.get_json()
+    image_data = data.get('image', '')
+    if not image_data:
+        return jsonify({'error': 'No image data'})
+
     try:
-        # Remove the "data:image/png;base64," prefix
-        image_data = image_data.split(',')[1]
-        # Convert base64 to image
-        image_bytes = base64.b64decode(image_data)
-        
-        # Run image processing in thread pool (CPU-bound)
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None, 
-            _process_image, 
-            image_bytes, 
-            analyzer, 
-            mode
-        )
-        
-        if 'error' in result:
-            return jsonify({'error': result['error']})
-        
-        # Process scan result
-        result_text = await loop.run_in_executor(
-            None,
-            engine.process_scan_result,
-            result
-        )
-        
-        # Check if it solves the puzzle
-        success = await loop.run_in_executor(
-            None,
-            engine.check_puzzle_solution,
-            result
-        )
-        
-        if success:
-            advance_text = await loop.run_in_executor(
-                None,
-                engine.advance_level
-            )
-            return jsonify({
-                'success': True,
-                'result': result_text,
-                'advance': advance_text,
-                'level': engine.state['current_level'] + 1
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'result': result_text,
-                'hint': 'Item saved to inventory. Puzzle not solved yet.'
-            })
-            
+        image_bytes = decode_data_url(image_data)
     except Exception as e:
         return jsonify({'error': str(e)})
+    return await submit_job(session, job_request_id(data), image_bytes, data.get('mode', 'any'))
+
+
+@app.route('/jobs/upload', methods=['POST'])
+async def submit_upload_job():
+    """Queue an uploaded image and return its job ID immediately."""
+    session = await get_or_create_session()
 
+    files = await request.files
+    form = await request.form
+    if 'file' not in files:
+        return jsonify({'error': 'No file uploaded'})
+    file = files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'})
 
-def _process_image(image_bytes: bytes, analyzer: CameraAnalyzer, mode: str) -> dict:
-    """Synchronous helper for image processing (runs in thread pool)."""
-    image = Image.open(io.BytesIO(image_bytes))
-    # Convert to format OpenCV likes
-    image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-    # Analyze the image
-    return analyzer.analyze_frame(image, mode)
+    return await submit_job(session, job_request_id(form), file.read(),
+                            form.get('mode', 'any'), upload=True)
+
+
+def find_job(job_id: str) -> Job:
+    session = sessions.get(request.cookies.get('session_id'))
+    return jobs.get(job_id, session.id) if session else None
+
+
+async def wait_for_job(job: Job, timeout: float):
+    """Wait for a job without blocking the event loop."""
+    try:
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+@app.route('/jobs/<job_id>')
+async def job_status(job_id):
+    """Job state; ?wait=N long-polls up to N seconds for the result."""
+    job = find_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+
+    timeout = min(request.args.get('wait', 0, type=float), JOB_POLL_TIMEOUT)
+    if timeout > 0:
+        await wait_for_job(job, timeout)
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/events')
+async def job_events(job_id):
+    """Server-Sent Events stream that delivers the job result once."""
+    job = find_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+
+    async def stream():
+        while not job.future.done():
+            await wait_for_job(job, SSE_KEEPALIVE)
+            if not job.future.done():
+                yield ': keepalive\n\n'
+        yield sse_event('result', json.dumps(job.to_dict()))
+
+    resp = await make_response(stream(), {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    resp.mimetype = 'text/event-stream'
+    resp.timeout = None
+    return resp
 
 
 @app.route('/save', methods=['POST'])
 async def save():
     """Save game (async version)."""
-    session_id = request.cookies.get('session_id', 'default')
-    if session_id in games:
-        loop = asyncio.get_event_loop()
-        success = await loop.run_in_executor(
-            None,
-            games[session_id].save_manager.save,
-            games[session_id].state
-        )
+    session = sessions.get(request.cookies.get('session_id'))
+    if session:
+        # Only snapshots the state; the write happens behind the request
+        engine = session.engine
+        success = await locked(session, lambda: engine.save_manager.save(engine.state))
         return jsonify({'saved': success})
     return jsonify({'saved': False})
 
@@ -183,21 +400,85 @@ async def health():
     """Health check endpoint."""
     return jsonify({
         'status': 'healthy',
-        'active_sessions': len(games),
+        'active_sessions': len(sessions),
+        'total_plays': default_analytics().counters.plays,
         'timestamp': datetime.now().isoformat()
     })
 
 
+@app.route('/metrics')
+async def metrics_snapshot():
+    """Scan queue depth, wait times and shed counts."""
+    snapshot = metrics.snapshot()
+    snapshot['gauges']['scan_queue_depth'] = scan_queue.depth
+    snapshot['gauges']['scan_queue_degraded'] = scan_queue.degraded
+    return jsonify(snapshot)
+
+
+@app.route('/complete')
+async def complete():
+    """Command completions for what has been typed (?q=), for Tab."""
+    text = request.args.get('q', '')[:64]
+    commands = GameEngine.commands
+    return jsonify({'completions': list(commands.complete(text)), 'text': commands.extend(text)})
+
+
+@app.route('/stats')
+async def stats():
+    """Play totals and per-sector solve time and attempt percentiles."""
+    analytics = default_analytics()
+    return jsonify(dict(analytics.get_stats(), sectors=analytics.get_sector_stats()))
+
+
+@app.route('/export')
+async def export_analytics():
+    """Stream analytics events or aggregates; needs VEIL_EXPORT_TOKEN."""
+    if not config.EXPORT_TOKEN:
+        return jsonify({'error': 'Not found'}), 404
+    if not export.authorized(config.EXPORT_TOKEN, request.headers):
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        options = export.request_options(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    chunks = export.export_chunks(default_analytics(), **options)
+
+    async def stream():
+        # File reads happen off the event loop, one chunk at a time
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            yield chunk
+
+    response = await make_response(stream(), 200, {
+        'Content-Type': export.FORMATS[options['fmt']],
+        'Content-Disposition': f'attachment; filename="{export.filename(options)}"',
+        'Cache-Control': 'no-store',
+    })
+    response.timeout = None  # Large exports outlast the default response timeout
+    return response
+
+
 async def cleanup_inactive_sessions():
     """Background task to cleanup old sessions (runs periodically)."""
     while True:
-        await asyncio.sleep(3600)  # Run every hour
-        # In production, you'd check last activity timestamp
-        # and remove sessions inactive for X minutes
-        app.logger.info(f"Active sessions: {len(games)}")
+        await asyncio.sleep(CLEANUP_INTERVAL)
+        removed = sessions.expire()
+        app.logger.info(f"Expired {removed} idle sessions")
+        app.logger.info(f"Active sessions: {len(sessions)}")
+
+
+@app.before_serving
+async def start_background_tasks():
+    app.cleanup_task = asyncio.create_task(cleanup_inactive_sessions())
+
+
+@app.after_serving
+async def stop_background_tasks():
+    app.cleanup_task.cancel()
+    save_writer.flush()
 
 
 if __name__ == '__main__':
     # Run on all network interfaces so iPhone can connect
-    # Note: For production async server, use hypercorn or uvicorn with asgiref
-    app.run(debug=True, host='0.0.0.0', port=5495, threaded=True)
+    # Note: this is Quart's development server; use hypercorn or uvicorn in production
+    app.run(debug=True, host='0.0.0.0', port=5495)
@@ -1,259 +1,304 @@
 """
 Terminal Veil - Web Edition with Extreme Difficulty Support
 """
-from flask import Flask, render_template, request, jsonify
-import base64
-import numpy as np
-import cv2
-from PIL import Image
-import io
-from datetime import datetime, timedelta
+from flask import Flask, Response, request, jsonify, g
+from werkzeug.middleware.proxy_fix import ProxyFix
+from concurrent.futures import wait
+from datetime import datetime
+import json
 
 from terminalveil.terminal import GameEngine
+from terminalveil.analytics import default_analytics
+from terminalveil import export
 from terminalveil.camera_handler import CameraAnalyzer
+from terminalveil.save_manager import SaveManager, default_store
+from terminalveil.save_writer import SaveWriter
+from terminalveil.sessions import SessionStore
+from terminalveil.scanning import decode_data_url, scan_job_starter, scan_outcome, submit_scan
+from terminalveil.jobs import JobStore, sse_event
+from terminalveil.web_assets import WebAssets
+from terminalveil.admission import Backpressure, ScanQueue
+from terminalveil.ratelimit import Budget, RateLimiter
+from terminalveil.metrics import metrics
+from terminalveil import config
 
-app = Flask(__name__)
+app = Flask(__name__, static_folder=None)  # /assets serves static/ under hashed names
+if config.PROXY_HOPS:
+    # Behind Render's proxy remote_addr is the proxy; trust its X-Forwarded-For
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=config.PROXY_HOPS)
 
-games = {}
-analyzers = {}
-last_activity = {}
+SESSION_MAX_AGE = 604800  # One week, matches the cookie lifetime
 
-def get_or_create_session(session_id):
-    if session_id not in games:
-        games[session_id] = GameEngine()
-        analyzers[session_id] = CameraAnalyzer()
-    last_activity[session_id] = datetime.now()
-    return games[session_id], analyzers[session_id]
+# Saves are written behind the request, coalesced per session
+save_writer = SaveWriter(default_store())
+
+def new_engine(session_id, fresh):
+    """Each browser saves to its own slot, never the shared local save"""
+    return GameEngine(save_manager=SaveManager(slot=session_id, writer=save_writer, fresh=fresh))
+
+# A cookie whose game is still saved gets it back after a restart
+sessions = SessionStore(new_engine, CameraAnalyzer, max_idle=SESSION_MAX_AGE,
+                        restorable=save_writer.has_slot)
+scan_queue = ScanQueue(
+    config.CV_WORKERS,
+    config.SCAN_QUEUE_DEPTH,
+    degrade_depth=config.DEGRADE_DEPTH if config.DEGRADE_SCANS else None
+)
+scan_budget = Budget(
+    'scan',
+    RateLimiter(config.SCAN_BUDGET, config.SCAN_REFILL),
+    RateLimiter(config.IP_SCAN_BUDGET, config.IP_SCAN_REFILL)
+)
+command_budget = Budget('command', RateLimiter(config.COMMAND_BUDGET, config.COMMAND_REFILL))
+jobs = JobStore()
+web_assets = WebAssets()  # Page rendered and compressed once, at startup
+
+JOB_POLL_TIMEOUT = 25  # Longest a long-poll may hold the connection
+SSE_KEEPALIVE = 15
+
+def scan_charger(session):
+    """Bill this request's session and IP for a scan's estimated cost"""
+    client_ip = request.remote_addr
+    return lambda cost: scan_budget.charge(session.id, client_ip, cost)
+
+def get_or_create_session():
+    """Session for this request's cookie; unknown/expired cookies get a new one"""
+    session, created = sessions.get_or_create(request.cookies.get('session_id'))
+    default_analytics().record_visit(session.id)
+    if created:
+        g.new_session_id = session.id
+    return session
+
+@app.after_request
+def set_session_cookie(resp):
+    session_id = g.pop('new_session_id', None)
+    if session_id:
+        resp.set_cookie('session_id', session_id, max_age=SESSION_MAX_AGE, httponly=True, samesite='Lax')
+    return resp
+
+def asset_response(asset):
+    status, body, headers = asset.respond(
+        request.headers.get('Accept-Encoding', ''),
+        request.headers.get('If-None-Match', '')
+    )
+    return Response(body, status=status, headers=headers)
 
 @app.route('/')
 def index():
-    session_id = request.cookies.get('session_id')
-    if not session_id or session_id not in games:
-        session_id = str(datetime.now().timestamp())
-        games[session_id] = GameEngine()
-        analyzers[session_id] = CameraAnalyzer()
-    
-    last_activity[session_id] = datetime.now()
-    
-    resp = app.make_response(render_template('index.html'))
-    resp.set_cookie('session_id', session_id, max_age=604800, httponly=True, samesite='Lax')
-    return resp
+    get_or_create_session()
+    return asset_response(web_assets.index)
+
+@app.route('/sw.js')
+def service_worker():
+    return asset_response(web_assets.service_worker)
+
+@app.route('/assets/<name>')
+def asset(name):
+    found = web_assets.get(name)
+    if found is None:
+        return jsonify({'error': 'Not found'}), 404
+    return asset_response(found)
+
+def scan_request(cmd):
+    """The client opens the camera for scan commands"""
+    return {
+        'type': 'scan_request',
+        'mode': cmd.lower().replace('scan', '').strip() or 'any'
+    }
 
 @app.route('/command', methods=['POST'])
 def command():
-    session_id = request.cookies.get('session_id', 'default')
-    engine, _ = get_or_create_session(session_id)
-    
+    session = get_or_create_session()
+    engine = session.engine
+
     data = request.json
     cmd = data.get('command', '')
-    
+
     if cmd.lower().startswith('scan'):
+        return jsonify(scan_request(cmd))
+
+    try:
+        command_budget.charge(session.id, request.remote_addr, 1)
+    except Backpressure as e:
+        return too_many_requests(e)
+
+    with session.lock:
+        response = engine.process_command(cmd)
+
         return jsonify({
-            'type': 'scan_request',
-            'mode': cmd.lower().replace('scan', '').strip() or 'any'
+            'type': 'text',
+            'response': response,
+            'level': engine.state['current_level'] + 1,
+            'inventory': len(engine.state['inventory']),
+            'victory': engine.check_victory()
+        })
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    """Run a list of commands in order under one session lock"""
+    session = get_or_create_session()
+    engine = session.engine
+
+    commands = (request.get_json(silent=True) or {}).get('commands')
+    if not isinstance(commands, list) or not all(isinstance(cmd, str) for cmd in commands):
+        return jsonify({'error': 'commands must be a list of strings'}), 400
+    if len(commands) > config.BATCH_MAX:
+        return jsonify({'error': f"At most {config.BATCH_MAX} commands per batch"}), 400
+
+    typed = [cmd for cmd in commands if not cmd.lower().startswith('scan')]
+    if typed:
+        try:
+            command_budget.charge(session.id, request.remote_addr, len(typed))
+        except Backpressure as e:
+            return too_many_requests(e)
+
+    with session.lock:
+        results = [
+            scan_request(cmd) if cmd.lower().startswith('scan')
+            else {'type': 'text', 'response': engine.process_command(cmd)}
+            for cmd in commands
+        ]
+        return jsonify({
+            'results': results,
+            'level': engine.state['current_level'] + 1,
+            'inventory': len(engine.state['inventory']),
+            'victory': engine.check_victory()
         })
-    
-    response = engine.process_command(cmd)
-    
-    return jsonify({
-        'type': 'text',
-        'response': response,
-        'level': engine.state['current_level'] + 1,
-        'inventory': len(engine.state['inventory']),
-        'victory': engine.check_victory()
-    })
 
-def process_scan_common(engine, analyzer, image_data, mode='any'):
+def process_scan_common(session, image_bytes, mode='any', upload=False):
     """Common scan processing for both camera and upload"""
-    if ',' in image_data:
-        image_data = image_data.split(',')[1]
-    
-    image_bytes = base64.b64decode(image_data)
-    image = Image.open(io.BytesIO(image_bytes))
-    image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-    
-    # For simultaneous detection (Level 11), try to detect multiple things
-    level = engine.get_current_level()
-    req = level.get('requirement', {}) if level else {}
-    
-    if req.get('simultaneous'):
-        # Try to detect both required items
-        result = analyzer.analyze_frame_simultaneous(image, req['simultaneous'])
-    else:
-        result = analyzer.analyze_frame(image, mode)
-    
-    return result
+    result = submit_scan(scan_queue, session, image_bytes, mode, upload,
+                         charge=scan_charger(session)).result()
+
+    with session.lock:
+        return scan_outcome(session.engine, result)
+
+def too_many_requests(e):
+    """Fast 429 when the scan queue is full or a budget is spent"""
+    resp = jsonify({'error': e.message, 'retry_after': e.retry_after})
+    resp.headers['Retry-After'] = str(e.retry_after)
+    return resp, 429
 
 @app.route('/scan', methods=['POST'])
 def scan():
-    session_id = request.cookies.get('session_id', 'default')
-    engine, analyzer = get_or_create_session(session_id)
-    
+    session = get_or_create_session()
+
     data = request.json
     image_data = data.get('image', '')
     mode = data.get('mode', 'any')
-    
+
     if not image_data:
         return jsonify({'error': 'No image data'})
-    
+
     try:
-        result = process_scan_common(engine, analyzer, image_data, mode)
-        
-        if 'error' in result:
-            return jsonify({'error': result['error']})
-        
-        success = engine.check_puzzle_solution(result)
-        result_text = engine.process_scan_result(result, add_to_inventory=success)
-        
-        if success:
-            advance_text = engine.advance_level()
-            return jsonify({
-                'success': True,
-                'result': result_text,
-                'advance': advance_text,
-                'level': engine.state['current_level'] + 1,
-                'total_levels': 13,
-                'reset': False
-            })
-        else:
-            level = engine.get_current_level()
-            req = level.get('requirement', {}) if level else {}
-            
-            # Check if sequence was reset
-            was_reset = len(engine.state['scans_this_level']) == 0 and (
-                req.get('sequence') or req.get('complex_sequence')
-            ) and engine.state['attempts_count'].get(engine.state['current_level'], 0) > 0
-            
-            if was_reset:
-                feedback = "[RESET] Sequence broken! Starting over."
-            else:
-                feedback = "Analysis complete. "
-                if req.get('sequence'):
-                    progress = engine.state['scans_this_level']
-                    target = req['sequence']
-                    feedback += f"Progress: {len(progress)}/{len(target)}"
-                elif req.get('complex_sequence'):
-                    progress = engine.state['scans_this_level']
-                    target = req['complex_sequence']
-                    feedback += f"Progress: {len(progress)}/{len(target)}"
-                elif req.get('simultaneous'):
-                    items = req['simultaneous']
-                    feedback += f"Need BOTH: {items[0].upper()} + {items[1].upper()} in ONE frame!"
-                else:
-                    needs = []
-                    if 'color' in req:
-                        needs.append(f"{req['color'].upper()} color")
-                    if 'qr_contains' in req:
-                        needs.append(f"QR '{req['qr_contains']}'")
-                    if 'shape' in req:
-                        needs.append(f"{req['shape'].upper()} shape")
-                    if 'barcode' in req:
-                        needs.append("barcode")
-                    if needs:
-                        feedback += f"Lock engaged. Need: {', '.join(needs)}"
-            
-            return jsonify({
-                'success': False,
-                'result': result_text,
-                'hint': feedback,
-                'reset': was_reset
-            })
-            
+        return jsonify(process_scan_common(session, decode_data_url(image_data), mode))
+    except Backpressure as e:
+        return too_many_requests(e)
     except Exception as e:
         return jsonify({'error': str(e)})
 
 @app.route('/upload', methods=['POST'])
 def upload():
-    session_id = request.cookies.get('session_id', 'default')
-    engine, analyzer = get_or_create_session(session_id)
-    
+    session = get_or_create_session()
+
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No file uploaded'})
-        
+
         file = request.files['file']
         mode = request.form.get('mode', 'any')
-        
+
         if file.filename == '':
             return jsonify({'error': 'No file selected'})
-        
-        image_bytes = file.read()
-        image = Image.open(io.BytesIO(image_bytes))
-        image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-        
-        level = engine.get_current_level()
-        req = level.get('requirement', {}) if level else {}
-        
-        if req.get('simultaneous'):
-            result = analyzer.analyze_frame_simultaneous(image, req['simultaneous'])
-        else:
-            result = analyzer.analyze_frame(image, mode)
-        
-        if 'error' in result:
-            return jsonify({'error': result['error']})
-        
-        success = engine.check_puzzle_solution(result)
-        result_text = engine.process_scan_result(result, add_to_inventory=success)
-        
-        if success:
-            advance_text = engine.advance_level()
-            return jsonify({
-                'success': True,
-                'result': result_text,
-                'advance': advance_text,
-                'level': engine.state['current_level'] + 1,
-                'total_levels': 13
-            })
-        else:
-            level = engine.get_current_level()
-            req = level.get('requirement', {}) if level else {}
-            
-            was_reset = len(engine.state['scans_this_level']) == 0 and (
-                req.get('sequence') or req.get('complex_sequence')
-            ) and engine.state['attempts_count'].get(engine.state['current_level'], 0) > 0
-            
-            if was_reset:
-                feedback = "[RESET] Sequence broken! Starting over."
-            else:
-                feedback = "Analysis complete."
-                if req.get('sequence'):
-                    progress = engine.state['scans_this_level']
-                    target = req['sequence']
-                    feedback += f" Progress: {len(progress)}/{len(target)}"
-                elif req.get('complex_sequence'):
-                    progress = engine.state['scans_this_level']
-                    target = req['complex_sequence']
-                    feedback += f" Progress: {len(progress)}/{len(target)}"
-                elif req.get('simultaneous'):
-                    items = req['simultaneous']
-                    feedback += f" Need BOTH: {items[0].upper()} + {items[1].upper()} in ONE frame!"
-                else:
-                    needs = []
-                    if 'color' in req:
-                        needs.append(f"{req['color'].upper()} color")
-                    if 'qr_contains' in req:
-                        needs.append(f"QR '{req['qr_contains']}'")
-                    if 'shape' in req:
-                        needs.append(f"{req['shape'].upper()} shape")
-                    if 'barcode' in req:
-                        needs.append("barcode")
-                    if needs:
-                        feedback += f" Lock engaged. Need: {', '.join(needs)}"
-            
-            return jsonify({
-                'success': False,
-                'result': result_text,
-                'hint': feedback
-            })
-            
+
+        return jsonify(process_scan_common(session, file.read(), mode, upload=True))
+    except Backpressure as e:
+        return too_many_requests(e)
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+def job_request_id(data):
+    """Client-chosen ID that makes a job submit safe to retry"""
+    return data.get('request_id') or request.headers.get('Idempotency-Key')
+
+def submit_job(session, request_id, image_bytes, mode, upload=False):
+    try:
+        job, _ = jobs.submit(session, request_id,
+                             scan_job_starter(scan_queue, session, image_bytes, mode, upload,
+                                              charge=scan_charger(session)))
+    except Backpressure as e:
+        return too_many_requests(e)
+    except Exception as e:
+        return jsonify({'error': str(e)})
+    return jsonify(job.to_dict()), 202
+
+@app.route('/jobs/scan', methods=['POST'])
+def submit_scan_job():
+    session = get_or_create_session()
+
+    data = request.json
+    image_data = data.get('image', '')
+    if not image_data:
+        return jsonify({'error': 'No image data'})
+
+    try:
+        image_bytes = decode_data_url(image_data)
     except Exception as e:
         return jsonify({'error': str(e)})
+    return submit_job(session, job_request_id(data), image_bytes, data.get('mode', 'any'))
+
+@app.route('/jobs/upload', methods=['POST'])
+def submit_upload_job():
+    session = get_or_create_session()
+
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded'})
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'})
+
+    return submit_job(session, job_request_id(request.form), file.read(),
+                      request.form.get('mode', 'any'), upload=True)
+
+def find_job(job_id):
+    session = sessions.get(request.cookies.get('session_id'))
+    return jobs.get(job_id, session.id) if session else None
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Job state; ?wait=N long-polls up to N seconds for the result"""
+    job = find_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+
+    timeout = min(request.args.get('wait', 0, type=float), JOB_POLL_TIMEOUT)
+    if timeout > 0:
+        wait([job.future], timeout=timeout)
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-Sent Events stream that delivers the job result once"""
+    job = find_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+
+    def stream():
+        while not job.future.done():
+            wait([job.future], timeout=SSE_KEEPALIVE)
+            if not job.future.done():
+                yield ': keepalive\n\n'
+        yield sse_event('result', json.dumps(job.to_dict()))
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/save', methods=['POST'])
 def save():
-    session_id = request.cookies.get('session_id', 'default')
-    if session_id in games:
-        success = games[session_id].save_manager.save(games[session_id].state)
+    session = sessions.get(request.cookies.get('session_id'))
+    if session:
+        with session.lock:
+            success = session.engine.save_manager.save(session.engine.state)
         return jsonify({'saved': success})
     return jsonify({'saved': False})
 
@@ -261,9 +306,47 @@ def save():
 def health():
     return jsonify({
         'status': 'healthy',
-        'active_sessions': len(games),
+        'active_sessions': len(sessions),
+        'total_plays': default_analytics().counters.plays,
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/metrics')
+def metrics_snapshot():
+    snapshot = metrics.snapshot()
+    snapshot['gauges']['scan_queue_depth'] = scan_queue.depth
+    snapshot['gauges']['scan_queue_degraded'] = scan_queue.degraded
+    return jsonify(snapshot)
+
+@app.route('/complete')
+def complete():
+    """Command completions for what has been typed (?q=), for Tab"""
+    text = request.args.get('q', '')[:64]
+    commands = GameEngine.commands
+    return jsonify({'completions': list(commands.complete(text)), 'text': commands.extend(text)})
+
+@app.route('/stats')
+def stats():
+    analytics = default_analytics()
+    return jsonify(dict(analytics.get_stats(), sectors=analytics.get_sector_stats()))
+
+@app.route('/export')
+def export_analytics():
+    """Stream analytics events or aggregates; needs VEIL_EXPORT_TOKEN"""
+    if not config.EXPORT_TOKEN:
+        return jsonify({'error': 'Not found'}), 404
+    if not export.authorized(config.EXPORT_TOKEN, request.headers):
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        options = export.request_options(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    resp = Response(export.export_chunks(default_analytics(), **options),
+                    mimetype=export.FORMATS[options['fmt']])
+    resp.headers['Content-Disposition'] = f'attachment; filename="{export.filename(options)}"'
+    resp.headers['Cache-Control'] = 'no-store'
+    return resp
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=10000)
@@ -0,0 +1,72 @@
+"""
+Terminal Veil - Save Format Benchmark
+Encode/decode time and size of the binary save format against JSON,
+for a fresh game, a mid-game save and a finished run. The JSON decode
+column is json.loads alone, the baseline the format was meant to beat ~10x
+on decode. It does not: binary decode is only about 1.3-2.5x faster,
+because building the GameState costs about a third of a json.loads by
+itself. The format's gains are size (5-12x smaller) and encode speed.
+
+    python benchmarks/bench_state_codec.py
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from terminalveil import state_codec  # noqa: E402
+from terminalveil.events import new_state  # noqa: E402
+from terminalveil.puzzles import LEVELS  # noqa: E402
+
+NUMBER = 20000
+
+
+def sample_states():
+    fresh = new_state()
+
+    mid = new_state()
+    mid.update({
+        'current_level': 10,
+        'inventory': [level['reward'] for level in LEVELS[:10]],
+        'scans_this_level': ['circle', 'square'],
+        'attempts_count': {level: 3 + level * 7 for level in range(11)},
+        'player_name': 'Neo',
+    })
+
+    done = new_state()
+    done.update({
+        'current_level': len(LEVELS),
+        'inventory': [level['reward'] for level in LEVELS],
+        'game_complete': True,
+        'attempts_count': {level: 5 + level * 11 for level in range(len(LEVELS) + 1)},
+        'first_success': '2026-01-01T12:00:00.000000',
+        'player_name': 'Trinity',
+    })
+    return {'fresh': fresh, 'mid-game': mid, 'complete': done}
+
+
+def per_call(fn, arg):
+    return min(timeit.repeat(lambda: fn(arg), number=NUMBER, repeat=5)) / NUMBER * 1e6
+
+
+def main():
+    print(f"{'state':<10} {'format':<7} {'bytes':>6} {'encode us':>10} {'decode us':>10}")
+    for label, state in sample_states().items():
+        as_dict = state.to_dict()
+        as_json = json.dumps(as_dict)
+        as_binary = state_codec.encode(state)
+        assert state_codec.decode(as_binary) == state_codec.decode(as_json)
+
+        rows = [
+            ('json', len(as_json), per_call(json.dumps, as_dict), per_call(json.loads, as_json)),
+            ('binary', len(as_binary), per_call(state_codec.encode, state),
+             per_call(state_codec.decode, as_binary)),
+        ]
+        for fmt, size, encode_us, decode_us in rows:
+            print(f"{label:<10} {fmt:<7} {size:>6} {encode_us:>10.2f} {decode_us:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
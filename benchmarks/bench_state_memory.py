@@ -0,0 +1,51 @@
+"""
+Terminal Veil - Session State Memory Benchmark
+Bytes each live session's state takes as the old dict of dicts and lists
+and as a GameState, for a fresh game, a mid-game save and a finished run.
+Both are built the way a server builds them, by loading a save.
+
+    python benchmarks/bench_state_memory.py
+"""
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_state_codec import sample_states  # noqa: E402
+from terminalveil import state_codec  # noqa: E402
+
+SESSIONS = 10000
+
+
+def as_dict(as_json):
+    """How the old JSON save loaded: plain dicts with int level keys"""
+    state = json.loads(as_json)
+    state['attempts_count'] = {int(level): count for level, count in state['attempts_count'].items()}
+    return state
+
+
+def per_session(load, data):
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    states = [load(data) for _ in range(SESSIONS)]
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del states
+    return used / SESSIONS
+
+
+def main():
+    print(f"{'state':<10} {'dict bytes':>11} {'GameState bytes':>16} {'saved':>6}")
+    for label, state in sample_states().items():
+        as_json = json.dumps(state.to_dict())
+        before = per_session(as_dict, as_json)
+        after = per_session(state_codec.decode, state_codec.encode(state))
+        print(f"{label:<10} {before:>11.0f} {after:>16.0f} {1 - after / before:>6.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -79,9 +79,13 @@ class TerminalInput(TextInput):
         self.padding = [10, 10]
         self.history = []
         self.history_index = -1
+        self.write_tab = False  # Tab completes commands instead
         
     def keyboard_on_key_down(self, window, keycode, text, modifiers):
-        """Handle up/down for history"""
+        """Handle up/down for history, Tab for completion"""
+        if keycode[1] == 'tab':
+            self.text = GameEngine.commands.extend(self.text)
+            return True
         if keycode[1] == 'up':
             if self.history and self.history_index < len(self.history) - 1:
                 self.history_index += 1
@@ -0,0 +1,296 @@
+let history = [], historyIndex = -1;
+const terminal = document.getElementById('terminal');
+const input = document.getElementById('command-input');
+
+window.onload = () => {
+    addLine('TERMINAL VEIL v2.0 // WEB EDITION');
+    addLine('');
+    addLine('Initializing neural interface...');
+    addLine('Camera subsystem: STANDBY');
+    addLine('Database: CONNECTED');
+    addLine('');
+    addLine('Type "help" or tap SCAN to begin');
+    addLine('');
+    input.focus();
+    runBatch(['look', 'status']);
+};
+
+function addLine(text) {
+    const div = document.createElement('div');
+    div.className = 'line';
+    // Use innerHTML for HTML-formatted text, textContent for plain text
+    if (text.includes('<')) {
+        div.innerHTML = text;
+    } else {
+        div.textContent = text;
+    }
+    terminal.appendChild(div);
+    terminal.scrollTop = terminal.scrollHeight;
+}
+
+function showResponse(response) {
+    response.split('\n').forEach(line => {
+        // Convert Kivy markup to HTML for display
+        const formatted = line
+            .replace(/\[b\](.*?)\[\/b\]/g, '<strong style="color:#0f0;">$1</strong>')
+            .replace(/\[color=00FFFF\](.*?)\[\/color\]/g, '<span style="color:#0ff;">$1</span>')
+            .replace(/\[color=([0-9A-Fa-f]{6})\](.*?)\[\/color\]/g, '<span style="color:#$1;">$2</span>');
+        addLine(formatted);
+    });
+}
+
+async function runBatch(commands) {
+    // Several commands in one round trip, run in order
+    try {
+        const res = await fetch('/batch', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({commands})
+        });
+        const data = await res.json();
+        if (data.error) {
+            addLine('ERROR: ' + data.error);
+            return;
+        }
+        data.results.forEach(result => {
+            if (result.response) showResponse(result.response);
+        });
+        updateStatus(data.level, data.inventory);
+    } catch (e) {
+        addLine('ERROR: ' + e.message);
+    }
+}
+
+async function sendCommand() {
+    const cmd = input.value.trim();
+    if (!cmd) return;
+
+    addLine('> ' + cmd);
+    input.value = '';
+
+    if (!history.includes(cmd)) history.unshift(cmd);
+    historyIndex = -1;
+
+    if (cmd.toLowerCase().startsWith('scan')) {
+        showCamera();
+        return;
+    }
+
+    try {
+        const res = await fetch('/command', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({command: cmd})
+        });
+        const data = await res.json();
+
+        if (data.error) {
+            addLine('ERROR: ' + data.error);
+            return;
+        }
+        if (data.response) showResponse(data.response);
+        if (data.victory) {
+            addLine('');
+            addLine('*** SYSTEM BREACH SUCCESSFUL ***');
+            addLine('The Veil has been lifted.');
+            addLine('Reality is code.');
+        }
+        updateStatus(data.level, data.inventory);
+    } catch (e) {
+        addLine('ERROR: ' + e.message);
+    }
+}
+
+function showCamera() {
+    document.getElementById('camera-modal').style.display = 'block';
+}
+
+function hideCamera() {
+    document.getElementById('camera-modal').style.display = 'none';
+}
+
+function newRequestId() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return Date.now().toString(36) + Math.random().toString(36).slice(2);
+}
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+// Submit a scan job. Network failures are retried with the same
+// request ID, so the server never analyzes the image twice.
+async function submitJob(url, makeInit, retries = 3) {
+    for (let attempt = 0; ; attempt++) {
+        try {
+            const res = await fetch(url, makeInit());
+            return await res.json();
+        } catch (err) {
+            if (attempt >= retries) throw err;
+            await sleep(1000 * (attempt + 1));
+        }
+    }
+}
+
+// Long-poll until the job is done
+async function pollJob(jobId, tries = 20) {
+    for (let attempt = 0; attempt < tries; attempt++) {
+        try {
+            const res = await fetch(`/jobs/${jobId}?wait=25`);
+            const data = await res.json();
+            if (data.error) return data;
+            if (data.status === 'done') return data.result;
+        } catch (err) {
+            await sleep(2000);
+        }
+    }
+    return {error: 'Lost contact with the neural link'};
+}
+
+// Wait for a job result pushed over Server-Sent Events,
+// falling back to long-polling if the stream drops
+function awaitJob(jobId) {
+    if (!window.EventSource) return pollJob(jobId);
+    return new Promise((resolve) => {
+        const source = new EventSource(`/jobs/${jobId}/events`);
+        source.addEventListener('result', (e) => {
+            source.close();
+            resolve(JSON.parse(e.data).result);
+        });
+        source.onerror = () => {
+            source.close();
+            resolve(pollJob(jobId));
+        };
+    });
+}
+
+async function runScanJob(url, makeInit) {
+    const job = await submitJob(url, makeInit);
+    if (job.error) return job;
+    if (job.status === 'done') return job.result;
+    return awaitJob(job.job_id);
+}
+
+function showScanResult(data, failLabel, resultLabel) {
+    if (data.error) {
+        addLine(failLabel + ': ' + data.error);
+        return;
+    }
+    addLine(resultLabel + ' ' + data.result);
+    if (data.success) {
+        addLine('');
+        addLine('>>> ACCESS GRANTED <<<');
+        if (data.advance) {
+            data.advance.split('\n').forEach(line => addLine(line));
+        }
+        updateStatus(data.level, null);
+    } else {
+        // Show reset warning with special styling
+        if (data.reset) {
+            addLine('[⚠️ SEQUENCE RESET] Wrong step! Starting over from step 1.');
+        }
+        addLine(data.hint || 'Lock remains engaged.');
+    }
+}
+
+function handleImage(event) {
+    const file = event.target.files[0];
+    if (!file) return;
+
+    addLine('[PROCESSING IMAGE...]');
+    hideCamera();
+
+    const reader = new FileReader();
+    reader.onload = async (e) => {
+        const body = JSON.stringify({image: e.target.result, mode: 'any', request_id: newRequestId()});
+        try {
+            const data = await runScanJob('/jobs/scan', () => ({
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: body
+            }));
+            showScanResult(data, 'SCAN FAILED', '[SCAN RESULT]');
+        } catch (err) {
+            addLine('ERROR: ' + err.message);
+        }
+    };
+    reader.readAsDataURL(file);
+    event.target.value = '';
+}
+
+async function handleFileUpload(event) {
+    const file = event.target.files[0];
+    if (!file) return;
+
+    addLine('[UPLOADING FILE...]');
+    hideCamera();
+
+    const requestId = newRequestId();
+    const makeForm = () => {
+        const formData = new FormData();
+        formData.append('file', file);
+        formData.append('mode', 'any');
+        formData.append('request_id', requestId);
+        return {method: 'POST', body: formData};
+    };
+
+    try {
+        const data = await runScanJob('/jobs/upload', makeForm);
+        showScanResult(data, 'UPLOAD FAILED', '[ANALYSIS RESULT]');
+    } catch (err) {
+        addLine('ERROR: ' + err.message);
+    }
+
+    event.target.value = '';
+}
+
+function updateStatus(lvl, inv) {
+    let txt = `SECTOR: ${lvl}/13`;
+    if (inv !== null) txt += ` | INVENTORY: ${inv} items`;
+    document.getElementById('status-bar').textContent = txt;
+}
+
+input.addEventListener('keypress', (e) => {
+    if (e.key === 'Enter') sendCommand();
+});
+
+async function completeCommand() {
+    try {
+        const res = await fetch('/complete?q=' + encodeURIComponent(input.value));
+        const data = await res.json();
+        if (data.text !== input.value) {
+            input.value = data.text;
+        } else if (data.completions.length > 1) {
+            addLine(data.completions.join('  '));
+        }
+    } catch (err) {
+        // Completion is a convenience; ignore network errors
+    }
+}
+
+input.addEventListener('keydown', (e) => {
+    if (e.key === 'Tab') {
+        e.preventDefault();
+        completeCommand();
+    } else if (e.key === 'ArrowUp') {
+        e.preventDefault();
+        if (historyIndex < history.length - 1) {
+            historyIndex++;
+            input.value = history[historyIndex];
+        }
+    } else if (e.key === 'ArrowDown') {
+        e.preventDefault();
+        if (historyIndex > 0) {
+            historyIndex--;
+            input.value = history[historyIndex];
+        } else {
+            historyIndex = -1;
+            input.value = '';
+        }
+    }
+});
+
+if ('serviceWorker' in navigator) {
+    // Keep the page and assets offline so later opens start from cache
+    window.addEventListener('load', () => {
+        navigator.serviceWorker.register('/sw.js').catch(() => {});
+    });
+}
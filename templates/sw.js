@@ -0,0 +1,36 @@
+// Terminal Veil service worker: the page and its assets come from a cache
+// named for this build, so opening the game needs no network. Everything
+// else (commands, scans, jobs) always goes to the server.
+const CACHE = 'veil-' + {{ version|tojson }};
+const SHELL = {{ shell|tojson }};
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(CACHE)
+            .then(cache => cache.addAll(SHELL))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    // A new build has a new cache name; drop the old ones
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys
+                .filter(key => key.startsWith('veil-') && key !== CACHE)
+                .map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (request.method !== 'GET' || url.origin !== location.origin || !SHELL.includes(url.pathname)) {
+        return;  // Network only
+    }
+    event.respondWith(
+        caches.match(url.pathname, {cacheName: CACHE})
+            .then(cached => cached || fetch(request))
+    );
+});
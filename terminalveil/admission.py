@@ -0,0 +1,104 @@
+"""
+Terminal Veil - Scan Admission Control
+A bounded, prioritized queue in front of the CV worker threads.
+Scans that would wait too long are shed immediately with a retry hint
+instead of piling up until the server times out.
+"""
+import heapq
+import itertools
+import math
+import threading
+import time
+from concurrent.futures import Future
+
+from terminalveil.metrics import metrics
+
+# Lower runs first
+PRIORITY_HIGH = 0    # Targeted scans (one detector)
+PRIORITY_NORMAL = 1  # Automatic scans from the camera
+PRIORITY_LOW = 2     # File uploads, usually large desktop images
+
+
+class Backpressure(Exception):
+    """Work refused for now (HTTP 429); retry_after is in whole seconds"""
+    message = 'Neural link congested. Retry shortly.'
+
+    def __init__(self, retry_after):
+        super().__init__(self.message)
+        self.retry_after = retry_after
+
+
+class QueueFull(Backpressure):
+    """Raised when a scan is shed because the queue is full"""
+
+
+def scan_priority(mode, upload=False):
+    """Pick a queue priority from what the scan will cost"""
+    if upload:
+        return PRIORITY_LOW
+    if mode != 'any':
+        return PRIORITY_HIGH
+    return PRIORITY_NORMAL
+
+
+class ScanQueue:
+    def __init__(self, workers, max_depth, degrade_depth=None):
+        self.max_depth = max_depth
+        self.degrade_depth = degrade_depth
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._avg_service = 0.5  # Seconds, smoothed as scans complete
+        self._workers = [
+            threading.Thread(target=self._worker, name=f'veil-cv-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @property
+    def depth(self):
+        return len(self._heap)
+
+    @property
+    def degraded(self):
+        """True while the backlog is deep enough to skip expensive detectors"""
+        return self.degrade_depth is not None and self.depth >= self.degrade_depth
+
+    def retry_after(self):
+        backlog = self.depth + len(self._workers)
+        return max(1, math.ceil(backlog * self._avg_service / len(self._workers)))
+
+    def submit(self, fn, *args, priority=PRIORITY_NORMAL):
+        """Queue fn(*args) and return a Future, or raise QueueFull"""
+        future = Future()
+        with self._cond:
+            if len(self._heap) >= self.max_depth:
+                metrics.incr('scans_shed')
+                raise QueueFull(self.retry_after())
+            heapq.heappush(self._heap, (priority, next(self._seq), time.monotonic(), future, fn, args))
+            metrics.set_gauge('scan_queue_depth', len(self._heap))
+            self._cond.notify()
+        metrics.incr('scans_admitted')
+        return future
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, enqueued, future, fn, args = heapq.heappop(self._heap)
+                metrics.set_gauge('scan_queue_depth', len(self._heap))
+
+            started = time.monotonic()
+            metrics.observe('scan_queue_wait', started - enqueued)
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                elapsed = time.monotonic() - started
+                metrics.observe('scan_service', elapsed)
+                self._avg_service = 0.8 * self._avg_service + 0.2 * elapsed
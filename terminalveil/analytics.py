@@ -1,93 +1,363 @@
 """
 Terminal Veil - Analytics and Hall of Fame
-Track game completions and statistics
+Track game completions and statistics. Records are appended to an
+event log (one JSON object per line) in buffered batches; a compactor
+periodically rolls the log up into the aggregate file, files its events
+into one archive per UTC day (for export.py) and starts a new empty log.
+One AnalyticsManager per process (default_analytics()) is shared by every
+engine, and all file access is under a lock file, so several worker
+processes can report to the same files. Reads never touch the log:
+plays, level reaches and attempts are also counted in memory-mapped
+SharedCounters, per-sector solve times and attempts in SectorHistograms,
+distinct visitors and players in HyperLogLog sketches, and completions
+are ranked in the Leaderboard.
 """
+import atexit
 import json
 import os
+import threading
+import time
+from collections import Counter
 from datetime import datetime
 
+from terminalveil.counters import SharedCounters
+from terminalveil.histograms import SectorHistograms
+from terminalveil.leaderboard import Leaderboard
+from terminalveil.paths import data_path
+from terminalveil.uniques import UniqueCounter
+
+try:
+    import fcntl
+except ImportError:  # Windows: single process only
+    fcntl = None
+
+FLUSH_INTERVAL = 5  # Seconds between appending buffered events
+COMPACT_INTERVAL = 300  # Seconds between roll-ups of the log
+COMPACT_BYTES = 1 << 20  # Or sooner, once the log grows past this
+HALL_OF_FAME_SIZE = 10
+
+
+def _empty():
+    return {
+        'total_plays': 0,
+        'completions': [],
+        'level_reaches': {},  # How many reached each level
+        'sector_attempts': {},  # Attempts per sector
+        'first_launch': datetime.now().isoformat()
+    }
+
+
+def _top(completions):
+    # Keep only the top entries by attempts (lower is better)
+    return sorted(completions, key=lambda x: x['attempts'])[:HALL_OF_FAME_SIZE]
+
+
+class _Counts:
+    """Aggregate of a run of events, ready to add to the totals"""
+    __slots__ = ('plays', 'level_reaches', 'sector_attempts', 'completions')
+
+    def __init__(self):
+        self.plays = 0
+        self.level_reaches = Counter()
+        self.sector_attempts = Counter()
+        self.completions = []
+
+    def __bool__(self):
+        return bool(self.plays or self.level_reaches or self.sector_attempts or self.completions)
+
+    def add(self, event):
+        kind = event.get('e')
+        if kind == 'play':
+            self.plays += 1
+        elif kind == 'reach':
+            self.level_reaches[f"level_{event['level']}"] += 1
+        elif kind == 'attempt':
+            self.sector_attempts[f"level_{event['level']}"] += 1
+        elif kind == 'completion':
+            self.completions.append({key: event.get(key) for key in
+                                     ('player', 'attempts', 'date', 'time_taken')})
+
+    def merge_into(self, data):
+        data['total_plays'] = data.get('total_plays', 0) + self.plays
+        for key, delta in (('level_reaches', self.level_reaches),
+                           ('sector_attempts', self.sector_attempts)):
+            counts = data.setdefault(key, {})
+            for level_key, count in delta.items():
+                counts[level_key] = counts.get(level_key, 0) + count
+        if self.completions:
+            data['completions'] = _top(data.get('completions', []) + self.completions)
+        return data
+
+
 class AnalyticsManager:
-    def __init__(self, filename='veil_analytics.json'):
-        self.filepath = os.path.join(os.path.expanduser('~'), filename)
-        self.data = self._load()
-    
-    def _load(self):
-        """Load analytics data"""
+    """
+    Thread-safe analytics shared by every engine in the process. Records
+    update the shared counters and buffer an event; a background thread
+    appends the buffer to the log every FLUSH_INTERVAL seconds and
+    compacts every COMPACT_INTERVAL.
+    """
+
+    def __init__(self, filename='veil_analytics.json', log_filename='veil_analytics.ndjson',
+                 flush_interval=FLUSH_INTERVAL, compact_interval=COMPACT_INTERVAL):
+        self.filepath = data_path(filename)
+        self.log_path = data_path(log_filename)
+        self.archive_dir = data_path('veil_analytics_archive')
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._buffer = []  # Events not yet in the log
+        self._flusher = None
+        self._compacted_at = 0
+        self.counters = SharedCounters(seed=self._read)
+        self.histograms = SectorHistograms()
+        self.visitors = UniqueCounter('visitors')  # Sessions that made any request
+        self.players = UniqueCounter('players')  # ...that actually started playing
+        self.leaderboard = Leaderboard(seed=lambda: self._read().get('completions', []))
+
+    def _read(self):
+        """Load aggregate data"""
         if not os.path.exists(self.filepath):
-            return {
-                'total_plays': 0,
-                'completions': [],
-                'level_reaches': {},  # How many reached each level
-                'sector_attempts': {},  # Attempts per sector
-                'first_launch': datetime.now().isoformat()
-            }
+            return _empty()
         try:
             with open(self.filepath, 'r') as f:
                 return json.load(f)
-        except:
-            return self._load()  # Reset on error
-    
-    def _save(self):
-        """Save analytics data"""
+        except Exception:
+            return _empty()  # Reset on error
+
+    def _write(self, data):
+        """Save aggregate data, atomically"""
+        tmp_path = f"{self.filepath}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.filepath)
+
+    def _locked_file(self, shared=False):
+        """Exclusive (or shared, for readers) lock with the other worker processes"""
+        lock_file = open(f"{self.filepath}.lock", 'a')
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        return lock_file
+
+    def _start_flusher(self):
+        with self._lock:
+            self._start_flusher_locked()
+
+    def _start_flusher_locked(self):
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._run, name='veil-analytics', daemon=True)
+            self._flusher.start()
+            atexit.register(self.compact)
+            atexit.register(self.flush)  # Runs first
+
+    def _record(self, event):
+        event['ts'] = time.time()
+        with self._lock:
+            self._buffer.append(event)
+            self._start_flusher_locked()
+
+    def _run(self):
+        self._compacted_at = time.monotonic()
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+            try:
+                log_size = os.path.getsize(self.log_path)
+            except OSError:
+                log_size = 0
+            if (log_size > COMPACT_BYTES or
+                    time.monotonic() - self._compacted_at >= self.compact_interval):
+                self.compact()
+
+    def _append(self):
+        # Caller holds self._io_lock
+        with self._lock:
+            events, self._buffer = self._buffer, []
+        if not events:
+            return True
         try:
-            with open(self.filepath, 'w') as f:
-                json.dump(self.data, f, indent=2)
+            lock_file = self._locked_file()
+            try:
+                with open(self.log_path, 'a') as f:
+                    f.write(''.join(json.dumps(event, separators=(',', ':')) + '\n'
+                                    for event in events))
+            finally:
+                lock_file.close()
         except Exception as e:
             print(f"Analytics save error: {e}")
-    
-    def record_game_start(self):
+            with self._lock:
+                self._buffer = events + self._buffer
+            return False
+        return True
+
+    def flush(self):
+        """Append buffered events to the log in one write; merge unique counts"""
+        self.visitors.flush()
+        self.players.flush()
+        with self._io_lock:
+            return self._append()
+
+    def _archive(self, days):
+        """Append compacted event lines to their day's archive file"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        for day, lines in days.items():
+            with open(os.path.join(self.archive_dir, f"events-{day}.ndjson"), 'a') as f:
+                f.write(''.join(lines))
+
+    def compact(self):
+        """Roll the whole log into the aggregate file and archive, then start a new log"""
+        with self._io_lock:
+            if not self._append():
+                return False
+            try:
+                lock_file = self._locked_file()
+                try:
+                    data = self._read()
+                    counts = _Counts()
+                    days = {}
+                    if os.path.exists(self.log_path):
+                        with open(self.log_path, 'r') as f:
+                            for line in f:
+                                try:
+                                    event = json.loads(line)
+                                except ValueError:
+                                    continue  # Torn line from a crashed writer
+                                counts.add(event)
+                                day = time.strftime('%Y-%m-%d', time.gmtime(event.get('ts', 0)))
+                                days.setdefault(day, []).append(line)
+                    self._archive(days)
+                    if counts or not os.path.exists(self.filepath):
+                        self._write(counts.merge_into(data))
+                    # A new empty log rather than a truncation, so a reader
+                    # holding the old one (see event_cut()) still sees it whole
+                    tmp_path = f"{self.log_path}.{os.getpid()}.tmp"
+                    open(tmp_path, 'w').close()
+                    os.replace(tmp_path, self.log_path)
+                finally:
+                    lock_file.close()
+            except Exception as e:
+                print(f"Analytics compaction error: {e}")
+                return False
+            self._compacted_at = time.monotonic()
+            return True
+
+    def event_cut(self):
+        """
+        Every logged event as of now: ([(archive path, size)], log file, log size).
+        Archives are only appended to and the log is only ever replaced, so
+        reading each file up to its size sees each event exactly once, even
+        if a compaction moves the log into the archives meanwhile.
+        """
+        lock_file = self._locked_file(shared=True)
+        try:
+            try:
+                names = sorted(os.listdir(self.archive_dir))
+            except OSError:
+                names = []
+            archives = []
+            for name in names:
+                path = os.path.join(self.archive_dir, name)
+                try:
+                    archives.append((path, os.path.getsize(path)))
+                except OSError:
+                    continue
+            try:
+                log = open(self.log_path, 'rb')
+            except OSError:
+                return archives, None, 0
+            return archives, log, os.fstat(log.fileno()).st_size
+        finally:
+            lock_file.close()
+
+    def record_visit(self, visitor_id):
+        """Count a distinct visitor (a session ID; only a hash is kept)"""
+        self.visitors.add(visitor_id)
+        self._start_flusher()
+
+    def record_game_start(self, player_id=None):
         """Record new game session"""
-        self.data['total_plays'] += 1
-        self._save()
-    
+        self.counters.add_play()
+        if player_id:
+            self.players.add(player_id)
+        self._record({'e': 'play'})
+
     def record_level_reach(self, level):
         """Record player reaching a level"""
-        level_key = f"level_{level}"
-        self.data['level_reaches'][level_key] = \
-            self.data['level_reaches'].get(level_key, 0) + 1
-        self._save()
-    
+        self.counters.add_reach(level)
+        self._record({'e': 'reach', 'level': level})
+
     def record_attempt(self, level):
         """Record attempt at a level"""
-        level_key = f"level_{level}"
-        self.data['sector_attempts'][level_key] = \
-            self.data['sector_attempts'].get(level_key, 0) + 1
-        self._save()
-    
+        self.counters.add_attempt(level)
+        self._record({'e': 'attempt', 'level': level})
+
+    def record_level_solved(self, level, seconds, attempts):
+        """Record how long and how many scans a sector took"""
+        self.histograms.record(level, seconds, attempts)
+        self._record({'e': 'solve', 'level': level, 'seconds': round(seconds, 3),
+                      'attempts': attempts})
+
     def record_completion(self, player_name, attempts, time_taken=None):
-        """Record game completion for Hall of Fame"""
+        """Record game completion for Hall of Fame; returns (rank, run), see Leaderboard.add"""
         completion = {
             'player': player_name,
             'attempts': attempts,
             'date': datetime.now().isoformat(),
             'time_taken': time_taken
         }
-        self.data['completions'].append(completion)
-        # Keep only top 10 by attempts (lower is better)
-        self.data['completions'].sort(key=lambda x: x['attempts'])
-        self.data['completions'] = self.data['completions'][:10]
-        self._save()
-    
+        self._record(dict(completion, e='completion'))
+        return self.leaderboard.add(completion)
+
     def get_hall_of_fame(self):
         """Get Hall of Fame entries"""
-        return self.data.get('completions', [])
-    
-    def get_stats(self):
-        """Get game statistics"""
-        completions = len(self.data.get('completions', []))
-        total_plays = self.data.get('total_plays', 0)
-        
+        return [entry for _, entry in self.leaderboard.top(HALL_OF_FAME_SIZE)]
+
+    def get_sector_stats(self):
+        """p50/p90/p99 time-to-solve and attempts for each sector"""
+        return self.histograms.summary()
+
+    def get_totals(self):
+        """Plays, completions and completion rate; cheap enough for every 'hof'"""
+        completions = len(self.leaderboard)
+        total_plays = self.counters.plays
+
         # Calculate completion rate
         completion_rate = (completions / total_plays * 100) if total_plays > 0 else 0
-        
-        # Find most attempted sector
-        sector_attempts = self.data.get('sector_attempts', {})
-        hardest_sector = max(sector_attempts, key=sector_attempts.get) if sector_attempts else "N/A"
-        
+
         return {
             'total_plays': total_plays,
             'completions': completions,
             'completion_rate': round(completion_rate, 2),
+        }
+
+    def get_stats(self):
+        """Get game statistics"""
+        totals = self.get_totals()
+
+        # Find most attempted sector
+        sector_attempts = self.counters.attempts()
+        hardest = max(range(len(sector_attempts)), key=sector_attempts.__getitem__)
+        hardest_sector = f"level_{hardest}" if sector_attempts[hardest] else "N/A"
+
+        return {
+            **totals,
             'hardest_sector': hardest_sector,
-            'unique_players': len(set(c['player'] for c in self.data.get('completions', [])))
+            'unique_players': self.players.count(),
+            'players_today': self.players.count('today'),
+            'unique_visitors': self.visitors.count(),
+            'visitors_today': self.visitors.count('today'),
+            'unique_finishers': self.leaderboard.players()
         }
+
+
+_default_analytics = None
+_default_analytics_lock = threading.Lock()
+
+
+def default_analytics():
+    """The process-wide analytics every engine reports to"""
+    global _default_analytics
+    with _default_analytics_lock:
+        if _default_analytics is None:
+            _default_analytics = AnalyticsManager()
+        return _default_analytics
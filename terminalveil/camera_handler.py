@@ -6,6 +6,10 @@ import cv2
 import numpy as np
 from pyzbar.pyzbar import decode
 
+# Detectors that are a few vectorized OpenCV passes (no zbar decode);
+# a loaded server can restrict 'any' scans to these
+CHEAP_DETECTORS = ('color', 'shape')
+
 class CameraAnalyzer:
     def __init__(self):
         self.color_ranges = {
@@ -16,32 +20,37 @@ class CameraAnalyzer:
             'yellow': ([20, 100, 100], [35, 255, 255])
         }
     
-    def analyze_frame(self, frame, mode='any'):
+    def analyze_frame(self, frame, mode='any', detectors=None):
         """
         Analyze frame and return detection result.
         Priority: QR > Barcode > Color > Shape
+        detectors optionally limits which detectors 'any' may run.
         """
+        def wanted(name):
+            if mode == name:
+                return True
+            return mode == 'any' and (detectors is None or name in detectors)
         
         # Check QR first (highest priority)
-        if mode in ['qr', 'any']:
+        if wanted('qr'):
             qr = self.scan_qr(frame)
             if qr:
                 return {'type': 'qr', 'data': qr}
         
         # Check Barcode
-        if mode in ['barcode', 'any']:
+        if wanted('barcode'):
             bc = self.scan_barcode(frame)
             if bc:
                 return {'type': 'barcode', 'data': bc}
         
         # Check Color BEFORE shape (color is easier to detect reliably)
-        if mode in ['color', 'any']:
+        if wanted('color'):
             color = self.detect_color(frame)
             if color:
                 return {'type': 'color', 'color': color}
         
         # Only check shape if color detection failed or mode is specifically 'shape'
-        if mode in ['shape', 'any']:
+        if wanted('shape'):
             shape = self.detect_shape(frame)
             if shape:
                 return {'type': 'shape', 'shape': shape}
@@ -0,0 +1,106 @@
+"""
+Terminal Veil - Command Registry
+Typed commands are declared on the engine with @command and collected
+once per class into a CommandRegistry: name and alias lookup for
+dispatch, and a prefix trie for completion. Every trie node keeps its
+sorted completions, so completing a prefix is one dict step per
+character, cheap enough for every keystroke.
+"""
+COMPLETION_LIMIT = 20
+
+
+class Command:
+    __slots__ = ('name', 'method', 'arity', 'aliases')
+
+    def __init__(self, name, method, arity=0, aliases=()):
+        self.name = name
+        self.method = method  # Engine method name, looked up per call so overrides work
+        self.arity = arity  # 0: no arguments (extra words ignored); '*': the words as a list
+        self.aliases = aliases
+
+
+def command(name, *aliases, arity=0):
+    """Declare an engine method as the handler of a typed command"""
+    def declare(method):
+        method.command = (name, aliases, arity)
+        return method
+    return declare
+
+
+class PrefixTrie:
+    """Words with the sorted completions of every prefix precomputed"""
+
+    def __init__(self, words=()):
+        self.root = {}
+        self.words = sorted(set(words))
+        for word in self.words:
+            node = self.root
+            for char in word:
+                node = node.setdefault(char, {})
+            node[None] = None  # End of word
+        self._completions = {}
+        self._index('', self.root)
+
+    def _index(self, prefix, node):
+        found = [prefix] if None in node else []
+        for char in sorted(key for key in node if key is not None):
+            found.extend(self._index(prefix + char, node[char]))
+        self._completions[id(node)] = tuple(found)
+        return found
+
+    def complete(self, prefix, limit=COMPLETION_LIMIT):
+        """Words starting with prefix, in order"""
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return ()
+        return self._completions[id(node)][:limit]
+
+
+def common_prefix(words):
+    """Longest prefix all of words share"""
+    if not words:
+        return ''
+    first, last = min(words), max(words)
+    size = 0
+    while size < len(first) and first[size] == last[size]:
+        size += 1
+    return first[:size]
+
+
+class CommandRegistry:
+    def __init__(self, commands):
+        self.commands = {}
+        for cmd in commands:
+            for word in (cmd.name,) + cmd.aliases:
+                self.commands[word] = cmd
+        self.trie = PrefixTrie(self.commands)
+
+    @classmethod
+    def collect(cls, engine_class):
+        """Registry of the @command methods of a class and its bases"""
+        found = {}
+        for klass in reversed(engine_class.__mro__):
+            for attr, value in vars(klass).items():
+                declared = getattr(value, 'command', None)
+                if declared:
+                    name, aliases, arity = declared
+                    found[name] = Command(name, attr, arity, aliases)
+        return cls(found.values())
+
+    def get(self, word):
+        return self.commands.get(word)
+
+    def complete(self, text, limit=COMPLETION_LIMIT):
+        """Completions for what has been typed so far (the command word only)"""
+        if ' ' in text.lstrip():
+            return ()
+        return self.trie.complete(text.lstrip().lower(), limit)
+
+    def extend(self, text):
+        """text completed as far as it is unambiguous, with a space after a whole command"""
+        matches = self.complete(text)
+        if len(matches) == 1:
+            return matches[0] + ' '
+        return common_prefix(matches) or text
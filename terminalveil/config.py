@@ -0,0 +1,57 @@
+"""
+Terminal Veil - Server Settings
+Tunables for the web servers, read once from the environment
+"""
+import os
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_flag(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Threads running OpenCV/zbar work (they release the GIL, so one per core)
+CV_WORKERS = _env_int('VEIL_CV_WORKERS', os.cpu_count() or 2)
+
+# Scans allowed to wait for a CV worker before new ones get a 429
+SCAN_QUEUE_DEPTH = _env_int('VEIL_SCAN_QUEUE_DEPTH', 32)
+
+# Under pressure, run only the cheap detectors for 'any' scans
+DEGRADE_SCANS = _env_flag('VEIL_DEGRADE_SCANS')
+DEGRADE_DEPTH = _env_int('VEIL_DEGRADE_DEPTH', SCAN_QUEUE_DEPTH // 2)
+
+# Token buckets charged per scan in megapixel-detectors (width x height /
+# 1e6 x detectors run); a 12 MP automatic scan costs 48
+SCAN_BUDGET = _env_float('VEIL_SCAN_BUDGET', 120)
+SCAN_REFILL = _env_float('VEIL_SCAN_REFILL', 2)
+IP_SCAN_BUDGET = _env_float('VEIL_IP_SCAN_BUDGET', 480)
+IP_SCAN_REFILL = _env_float('VEIL_IP_SCAN_REFILL', 8)
+
+# Typed commands cost 1 each from their own, much larger budget
+COMMAND_BUDGET = _env_float('VEIL_COMMAND_BUDGET', 60)
+COMMAND_REFILL = _env_float('VEIL_COMMAND_REFILL', 10)
+
+# Most commands one POST /batch may run (each is charged as a command)
+BATCH_MAX = _env_int('VEIL_BATCH_MAX', 20)
+
+# Reverse proxies in front of the server whose X-Forwarded-For is trusted
+PROXY_HOPS = _env_int('VEIL_PROXY_HOPS', 0)
+
+# Bearer token for GET /export; the route is disabled while unset
+EXPORT_TOKEN = os.environ.get('VEIL_EXPORT_TOKEN', '')
@@ -0,0 +1,145 @@
+"""
+Terminal Veil - Shared Counters
+Small fixed-layout files of uint64 counters, memory-mapped by every
+worker process on the machine. SharedCounters holds total plays, then
+level reaches and attempts for every level in LEVELS. Increments lock
+just their own 8 bytes with fcntl; reads are plain loads from the map.
+"""
+import mmap
+import struct
+import threading
+
+from terminalveil.paths import data_path
+from terminalveil.puzzles import LEVELS
+
+try:
+    import fcntl
+except ImportError:  # Windows: single process only
+    fcntl = None
+
+MAGIC = b'TVC1'
+
+# magic, a layout parameter (levels per table); then the uint64 slots
+_HEADER = struct.Struct('<4sI')
+_SLOT = struct.Struct('<Q')
+
+
+class MappedArray:
+    """A file of uint64 slots shared through mmap"""
+
+    def __init__(self, filename, magic, param, slots, seed=None):
+        # slots(param) gives the array length; seed(array) fills a new file
+        self.filepath = data_path(filename)
+        self.magic = magic
+        self.param = param
+        self.slots = slots
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+
+    def _open(self):
+        """Map the file, creating it on first use"""
+        with self._lock:
+            if self._map is not None:
+                return self._map
+            f = open(self.filepath, 'a+b')
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                header = f.read(_HEADER.size)
+                if len(header) == _HEADER.size and header[:4] == self.magic:
+                    self.param = _HEADER.unpack(header)[1]
+                else:
+                    f.truncate(0)
+                    f.write(_HEADER.pack(self.magic, self.param))
+                    f.write(bytes(_SLOT.size * self.slots(self.param)))
+                    f.flush()
+                    if self.seed:
+                        self._map = mmap.mmap(f.fileno(), 0)
+                        self.seed(self)
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            self._file = f
+            if self._map is None:
+                self._map = mmap.mmap(f.fileno(), 0)
+            return self._map
+
+    def set(self, index, value):
+        """Only for seeding a new file"""
+        _SLOT.pack_into(self._map, _HEADER.size + index * _SLOT.size, value)
+
+    def add(self, index, amount=1):
+        data = self._map if self._map is not None else self._open()
+        offset = _HEADER.size + index * _SLOT.size
+        with self._lock:
+            if fcntl:
+                fcntl.lockf(self._file, fcntl.LOCK_EX, _SLOT.size, offset)
+            try:
+                (value,) = _SLOT.unpack_from(data, offset)
+                _SLOT.pack_into(data, offset, value + amount)
+            finally:
+                if fcntl:
+                    fcntl.lockf(self._file, fcntl.LOCK_UN, _SLOT.size, offset)
+
+    def get(self, index):
+        data = self._map if self._map is not None else self._open()
+        return _SLOT.unpack_from(data, _HEADER.size + index * _SLOT.size)[0]
+
+    def values(self, start, count):
+        data = self._map if self._map is not None else self._open()
+        return struct.unpack_from(f'<{count}Q', data, _HEADER.size + start * _SLOT.size)
+
+    @property
+    def layout(self):
+        """The layout parameter of the file (may differ from the one asked for)"""
+        if self._map is None:
+            self._open()
+        return self.param
+
+
+class SharedCounters:
+    def __init__(self, filename='veil_counters.bin', levels=len(LEVELS) + 1, seed=None):
+        # One more level than LEVELS: 'reached' the end means a completion.
+        # seed() returns aggregate totals to start a new file from.
+        self.totals = seed
+        self.array = MappedArray(filename, MAGIC, levels, lambda levels: 1 + 2 * levels,
+                                 seed=self._seed if seed else None)
+
+    @property
+    def levels(self):
+        return self.array.layout
+
+    def _seed(self, array):
+        totals = self.totals()
+        array.set(0, totals.get('total_plays', 0))
+        for table, key in ((0, 'level_reaches'), (1, 'sector_attempts')):
+            for level_key, count in totals.get(key, {}).items():
+                level = int(level_key.rsplit('_', 1)[-1])
+                if 0 <= level < array.param:
+                    array.set(1 + table * array.param + level, count)
+
+    def add_play(self):
+        self.array.add(0)
+
+    def add_reach(self, level):
+        if 0 <= level < self.levels:
+            self.array.add(1 + level)
+
+    def add_attempt(self, level):
+        if 0 <= level < self.levels:
+            self.array.add(1 + self.levels + level)
+
+    @property
+    def plays(self):
+        return self.array.get(0)
+
+    def reaches(self):
+        """Players who reached each level, indexed by level"""
+        return self.array.values(1, self.levels)
+
+    def attempts(self):
+        """Scans checked against each level, indexed by level"""
+        return self.array.values(1 + self.levels, self.levels)
@@ -0,0 +1,71 @@
+"""
+Terminal Veil - Game Events
+Every change to a player's state is a small event applied by apply_event().
+Saves store a snapshot plus the events appended after it, so persisting a
+scan is a cheap append and loading is snapshot-plus-tail replay. Replaying
+a slot from the start reproduces a player's run step by step.
+"""
+from terminalveil.game_state import GameState
+from terminalveil.puzzles import LEVELS
+
+# Snapshot a slot after this many events since the last snapshot
+SNAPSHOT_EVERY = 50
+
+
+def new_state():
+    """A fresh game at sector 1"""
+    return GameState()
+
+
+def apply_event(state, kind, data):
+    """Apply one event to state in place"""
+    if kind == 'attempt':
+        level = data['level']
+        state['attempts_count'][level] = state['attempts_count'].get(level, 0) + 1
+        at = data.get('t')
+        if state['started_at'] is None:
+            state['started_at'] = at
+        if state['level_started_at'] is None:
+            state['level_started_at'] = at
+    elif kind == 'progress':
+        state['scans_this_level'].append(data['step'])
+    elif kind == 'reset':
+        state['scans_this_level'] = []
+    elif kind == 'advance':
+        state['current_level'] += 1
+        state['scans_this_level'] = []
+        state['level_started_at'] = None  # Clock starts at the first scan
+        if state['current_level'] not in state['attempts_count']:
+            state['attempts_count'][state['current_level']] = 0
+        if state['current_level'] >= len(LEVELS):
+            state['game_complete'] = True
+            if not state['first_success']:
+                state['first_success'] = data['at']
+    elif kind == 'name':
+        state['player_name'] = data['name']
+    elif kind == 'seed':
+        state['seed'] = data['seed']
+    elif kind == 'ranked':
+        state['hall_of_fame_run'] = data['run']  # Leaderboard.run_id() of the completion
+    else:
+        raise ValueError(f"Unknown game event: {kind}")
+    return state
+
+
+def replay(state, events):
+    """Apply (kind, data) events in order; returns state"""
+    for kind, data in events:
+        apply_event(state, kind, data)
+    return state
+
+
+def replay_run(store, slot):
+    """
+    Re-run a slot's whole history from a fresh game, yielding
+    (seq, kind, data, state) after each event. For debugging, e.g. where
+    a sequence puzzle reset.
+    """
+    state = new_state()
+    for seq, kind, data, _ in store.events(slot):
+        apply_event(state, kind, data)
+        yield seq, kind, data, state
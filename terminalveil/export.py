@@ -0,0 +1,216 @@
+"""
+Terminal Veil - Analytics Export
+Streams analytics events (from the daily archives and the live log) or
+the current aggregates as NDJSON or CSV, one chunk at a time, so an
+export of any size runs in constant memory.
+
+    python -m terminalveil.export --since 2026-01-01 --format csv > events.csv
+"""
+import argparse
+import csv
+import hmac
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+EVENT_FIELDS = ('ts', 'e', 'level', 'player', 'attempts', 'seconds', 'time_taken', 'date')
+AGGREGATE_FIELDS = ('metric', 'level', 'value')
+CHUNK_BYTES = 64 * 1024
+
+
+def parse_time(text):
+    """Epoch seconds from epoch seconds or an ISO date/datetime (UTC if naive)"""
+    if text is None or text == '':
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"Bad time: {text!r} (use epoch seconds or ISO 8601)")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _day(epoch):
+    return time.strftime('%Y-%m-%d', time.gmtime(epoch))
+
+
+def _event_files(analytics, since, until):
+    """(file, end offset) for each archive day in range, then the live log"""
+    prefix, suffix = 'events-', '.ndjson'
+    archives, log, log_size = analytics.event_cut()
+    for path, size in archives:
+        name = os.path.basename(path)
+        if not (name.startswith(prefix) and name.endswith(suffix)):
+            continue
+        day = name[len(prefix):-len(suffix)]
+        if since is not None and day < _day(since):
+            continue
+        if until is not None and day > _day(until):
+            continue
+        try:
+            yield open(path, 'rb'), size
+        except OSError:
+            continue
+    if log is not None:
+        yield log, log_size  # Not compacted yet
+
+
+def _lines(f, end):
+    """Whole lines of f up to byte offset end"""
+    with f:
+        for raw in f:
+            end -= len(raw)
+            if end < 0 or not raw.endswith(b'\n'):
+                break  # Appended after the cut
+            yield raw.decode('utf-8', 'replace')
+            if end == 0:
+                break
+
+
+def iter_events(analytics, since=None, until=None, kinds=None):
+    """Yield (raw_line, event) for events with since <= ts < until, as of one moment"""
+    for f, end in _event_files(analytics, since, until):
+        for line in _lines(f, end):
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            ts = event.get('ts', 0)
+            if since is not None and ts < since:
+                continue
+            if until is not None and ts >= until:
+                continue
+            if kinds and event.get('e') not in kinds:
+                continue
+            yield line, event
+
+
+def iter_aggregates(analytics):
+    """Yield {'metric', 'level', 'value'} rows for the current aggregates"""
+    stats = analytics.get_stats()
+    for metric, value in stats.items():
+        if metric != 'hardest_sector':
+            yield {'metric': metric, 'level': None, 'value': value}
+    counters = analytics.counters
+    for metric, values in (('level_reaches', counters.reaches()),
+                           ('sector_attempts', counters.attempts())):
+        for level, value in enumerate(values):
+            if value:
+                yield {'metric': metric, 'level': level, 'value': value}
+    for sector, summary in analytics.get_sector_stats().items():
+        level = int(sector.rsplit('_', 1)[-1]) - 1
+        yield {'metric': 'solved', 'level': level, 'value': summary['solved']}
+        for kind in ('seconds', 'attempts'):
+            for percentile, value in summary[kind].items():
+                yield {'metric': f"{kind}_{percentile}", 'level': level, 'value': value}
+
+
+def _csv_line(writer, buffer, row):
+    buffer.seek(0)
+    buffer.truncate()
+    writer.writerow(row)
+    return buffer.getvalue()
+
+
+def export_lines(analytics, what='events', fmt='ndjson', since=None, until=None, kinds=None):
+    """Yield the export one line at a time"""
+    fields = EVENT_FIELDS if what == 'events' else AGGREGATE_FIELDS
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fields, extrasaction='ignore', lineterminator='\n')
+        yield ','.join(fields) + '\n'
+
+    if what == 'events':
+        for line, event in iter_events(analytics, since, until, kinds):
+            yield _csv_line(writer, buffer, event) if fmt == 'csv' else line
+    else:
+        for row in iter_aggregates(analytics):
+            if fmt == 'csv':
+                yield _csv_line(writer, buffer, row)
+            else:
+                yield json.dumps(row, separators=(',', ':')) + '\n'
+
+
+def export_chunks(analytics, chunk_bytes=CHUNK_BYTES, **options):
+    """export_lines() joined into chunks of about chunk_bytes"""
+    chunk, size = [], 0
+    for line in export_lines(analytics, **options):
+        chunk.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def request_options(args):
+    """export_lines() options from query parameters; raises ValueError"""
+    what = args.get('what', 'events')
+    fmt = args.get('format', 'ndjson')
+    if what not in ('events', 'aggregates'):
+        raise ValueError("what must be 'events' or 'aggregates'")
+    if fmt not in FORMATS:
+        raise ValueError("format must be 'ndjson' or 'csv'")
+    kinds = [kind for kind in args.get('kind', '').split(',') if kind]
+    return {
+        'what': what,
+        'fmt': fmt,
+        'since': parse_time(args.get('since')),
+        'until': parse_time(args.get('until')),
+        'kinds': set(kinds) or None,
+    }
+
+
+def authorized(token, headers):
+    """
+    True if the request carries token as a Bearer header. Never taken from
+    the query string, which ends up in proxy and access logs.
+    """
+    if not token:
+        return False
+    supplied = headers.get('Authorization', '')
+    if not supplied.startswith('Bearer '):
+        return False
+    return hmac.compare_digest(supplied[len('Bearer '):].encode('utf-8'), token.encode('utf-8'))
+
+
+def filename(options):
+    return f"veil-{options['what']}.{'csv' if options['fmt'] == 'csv' else 'ndjson'}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export Terminal Veil analytics')
+    parser.add_argument('--what', choices=('events', 'aggregates'), default='events')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='ndjson')
+    parser.add_argument('--since', help='Epoch seconds or ISO 8601 (inclusive)')
+    parser.add_argument('--until', help='Epoch seconds or ISO 8601 (exclusive)')
+    parser.add_argument('--kind', action='append', help='Only these event kinds (play, attempt, solve, ...)')
+    opts = parser.parse_args(argv)
+
+    from terminalveil.analytics import default_analytics
+    try:
+        options = {
+            'what': opts.what,
+            'fmt': opts.format,
+            'since': parse_time(opts.since),
+            'until': parse_time(opts.until),
+            'kinds': set(opts.kind) if opts.kind else None,
+        }
+    except ValueError as e:
+        parser.error(str(e))
+    for chunk in export_chunks(default_analytics(), **options):
+        sys.stdout.write(chunk)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""
+Terminal Veil - Compact Game State
+A session's state in slots instead of a dict of dicts and lists: attempt
+counts in an array indexed by level, the inventory as a bitset of level
+rewards, sequence progress in a buffer sized for the longest sequence.
+GameState still reads and writes like the old dict, so callers keep
+indexing it by key.
+"""
+from array import array
+from collections.abc import MutableMapping, Sequence
+
+from terminalveil.puzzles import LEVELS
+
+REWARDS = tuple(level['reward'] for level in LEVELS)
+REWARD_BITS = {reward: 1 << i for i, reward in enumerate(REWARDS)}
+
+# Steps in the longest sequence puzzle
+PROGRESS_SIZE = max(
+    len(level['requirement'].get('sequence', level['requirement'].get('complex_sequence', ())))
+    for level in LEVELS
+)
+
+_MISSING = object()
+
+
+class AttemptCounts(MutableMapping):
+    """Scans per level, as an array of uint32; every level up to the highest is a key"""
+    __slots__ = ('counts',)
+
+    def __init__(self, counts=()):
+        self.counts = array('I', counts)
+
+    @classmethod
+    def of(cls, value):
+        if isinstance(value, cls):
+            return value
+        attempts = cls()
+        for level, count in value.items():
+            attempts[int(level)] = count
+        return attempts
+
+    def __getitem__(self, level):
+        if 0 <= level < len(self.counts):
+            return self.counts[level]
+        raise KeyError(level)
+
+    def get(self, level, default=None):
+        return self.counts[level] if 0 <= level < len(self.counts) else default
+
+    def __setitem__(self, level, count):
+        if level < 0:
+            raise KeyError(level)
+        if level >= len(self.counts):
+            self.counts.extend(bytes(level + 1 - len(self.counts)))
+        self.counts[level] = count
+
+    def __delitem__(self, level):
+        if not 0 <= level < len(self.counts):
+            raise KeyError(level)
+        if level == len(self.counts) - 1:
+            self.counts.pop()
+        else:
+            self.counts[level] = 0
+
+    def __contains__(self, level):
+        return isinstance(level, int) and 0 <= level < len(self.counts)
+
+    def total(self):
+        return sum(self.counts)
+
+    def __iter__(self):
+        return iter(range(len(self.counts)))
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class Inventory(Sequence):
+    """Collected items: level rewards as a bitset, anything else in a tuple"""
+    __slots__ = ('bits', 'others')
+
+    def __init__(self, bits=0, others=()):
+        self.bits = bits
+        self.others = others
+
+    @classmethod
+    def of(cls, items):
+        if isinstance(items, cls):
+            return items
+        inventory = cls()
+        for item in items:
+            inventory.append(item)
+        return inventory
+
+    def key(self):
+        """Hashable contents, e.g. for caching text that lists the items"""
+        return self.bits, self.others
+
+    def append(self, item):
+        bit = REWARD_BITS.get(item)
+        if bit is None or self.bits & bit:
+            self.others += (item,)
+        else:
+            self.bits |= bit
+
+    def __iter__(self):
+        bits = self.bits
+        for i, reward in enumerate(REWARDS):
+            if bits >> i & 1:
+                yield reward
+        yield from self.others
+
+    def __getitem__(self, index):
+        return list(self)[index]
+
+    def __len__(self):
+        return bin(self.bits).count('1') + len(self.others)
+
+    def __contains__(self, item):
+        bit = REWARD_BITS.get(item)
+        return bool(bit is not None and self.bits & bit) or item in self.others
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, Inventory)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class Progress(Sequence):
+    """Steps of the current sequence puzzle, in a fixed-size buffer"""
+    __slots__ = ('steps', 'size')
+
+    def __init__(self, steps=()):
+        self.steps = None  # Allocated on the first step
+        self.size = 0
+        for step in steps:
+            self.append(step)
+
+    @classmethod
+    def of(cls, steps):
+        return steps if isinstance(steps, cls) else cls(steps)
+
+    def append(self, step):
+        if self.steps is None:
+            self.steps = [None] * PROGRESS_SIZE
+        elif self.size == len(self.steps):
+            self.steps.append(None)  # Longer than any level needs; an old save
+        self.steps[self.size] = step
+        self.size += 1
+
+    def clear(self):
+        self.steps = None
+        self.size = 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        return self.steps[index]
+
+    def __iter__(self):
+        return iter(self.steps[:self.size] if self.size else ())
+
+    def __len__(self):
+        return self.size
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, Progress)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+# Keys in dict order; player_name only once set
+FIELDS = (
+    'current_level', 'inventory', 'flags', 'scans_this_level', 'game_complete',
+    'easter_eggs_found', 'attempts_count', 'first_success', 'started_at',
+    'level_started_at', 'seed',
+)
+_SLOTTED = frozenset(FIELDS + ('player_name',))
+_CONVERT = {
+    'inventory': Inventory.of,
+    'attempts_count': AttemptCounts.of,
+    'scans_this_level': Progress.of,
+}
+
+
+class GameState(MutableMapping):
+    """A fresh game at sector 1; indexed like the old state dict"""
+    __slots__ = FIELDS + ('player_name', 'extra')
+
+    def __init__(self):
+        self.current_level = 0
+        self.inventory = Inventory()
+        self.flags = None  # Empty dicts and lists are made on first access
+        self.scans_this_level = Progress()
+        self.game_complete = False
+        self.easter_eggs_found = None
+        self.attempts_count = AttemptCounts((0,))
+        self.first_success = None
+        self.started_at = None
+        self.level_started_at = None
+        self.seed = None
+        self.player_name = _MISSING
+        self.extra = None  # Keys this class does not know, from newer saves
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        state.update(data)
+        return state
+
+    def to_dict(self):
+        """A plain dict of lists and dicts, e.g. for JSON"""
+        data = {
+            'current_level': self.current_level,
+            'inventory': list(self.inventory),
+            'flags': dict(self.flags or {}),
+            'scans_this_level': list(self.scans_this_level),
+            'game_complete': self.game_complete,
+            'easter_eggs_found': list(self.easter_eggs_found or ()),
+            'attempts_count': dict(self.attempts_count.items()),
+            'first_success': self.first_success,
+            'started_at': self.started_at,
+            'level_started_at': self.level_started_at,
+            'seed': self.seed,
+        }
+        if self.player_name is not _MISSING:
+            data['player_name'] = self.player_name
+        data.update(self.extra or {})
+        return data
+
+    def __getitem__(self, key):
+        if key in _SLOTTED:
+            value = getattr(self, key)
+            if value is None and key == 'flags':
+                value = self.flags = {}
+            elif value is None and key == 'easter_eggs_found':
+                value = self.easter_eggs_found = []
+            elif value is _MISSING:
+                raise KeyError(key)
+            return value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in _SLOTTED:
+            convert = _CONVERT.get(key)
+            setattr(self, key, convert(value) if convert else value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key == 'player_name' and self.player_name is not _MISSING:
+            self.player_name = _MISSING
+        elif self.extra and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key == 'player_name':
+            return self.player_name is not _MISSING
+        return key in _SLOTTED or bool(self.extra and key in self.extra)
+
+    def __iter__(self):
+        yield from FIELDS
+        if self.player_name is not _MISSING:
+            yield 'player_name'
+        if self.extra:
+            yield from list(self.extra)
+
+    def __len__(self):
+        return len(FIELDS) + (self.player_name is not _MISSING) + len(self.extra or ())
+
+    def __repr__(self):
+        return f"GameState({self.to_dict()!r})"
+
@@ -0,0 +1,91 @@
+"""
+Terminal Veil - Sector Histograms
+Log-bucketed (HDR-style) histograms of time-to-solve and attempts for
+every sector. The buckets live in a shared memory-mapped counter file,
+so memory is fixed, updates are O(1) and every worker sees the same
+distribution; percentiles come from one walk over a sector's buckets.
+"""
+from terminalveil.counters import MappedArray
+from terminalveil.puzzles import LEVELS
+
+SUB_BITS = 5
+SUB_BUCKETS = 1 << SUB_BITS  # Per doubling: about 3% relative error
+LINEAR = 2 * SUB_BUCKETS  # Values below this get a bucket each
+MAX_SHIFT = 40
+BUCKETS = LINEAR + MAX_SHIFT * SUB_BUCKETS
+
+TIME = 0  # Milliseconds from the first scan in a sector to solving it
+ATTEMPTS = 1  # Scans it took
+
+PERCENTILES = (50, 90, 99)
+
+
+def bucket_of(value):
+    value = max(0, int(value))
+    if value < LINEAR:
+        return value
+    shift = value.bit_length() - SUB_BITS - 1  # value >> shift has SUB_BITS + 1 bits
+    return min(BUCKETS - 1, LINEAR + (shift - 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS)
+
+
+def value_of(bucket):
+    """The middle of the range of values a bucket counts"""
+    if bucket < LINEAR:
+        return bucket
+    shift, sub = divmod(bucket - LINEAR, SUB_BUCKETS)
+    shift += 1
+    low = (sub + SUB_BUCKETS) << shift
+    return low + ((1 << shift) - 1) / 2
+
+
+def percentiles(counts, wanted=PERCENTILES):
+    """{p: value} from a list of bucket counts, or None if empty"""
+    total = sum(counts)
+    if not total:
+        return None
+    result = {}
+    targets = iter(sorted(wanted))
+    target = next(targets)
+    seen = 0
+    for bucket, count in enumerate(counts):
+        seen += count
+        while target is not None and seen * 100 >= target * total:
+            result[target] = value_of(bucket)
+            target = next(targets, None)
+        if target is None:
+            break
+    return result
+
+
+class SectorHistograms:
+    def __init__(self, filename='veil_histograms.bin', levels=len(LEVELS)):
+        self.array = MappedArray(filename, b'TVH1', levels, lambda levels: levels * 2 * BUCKETS)
+
+    def _base(self, level, kind):
+        return (level * 2 + kind) * BUCKETS
+
+    def record(self, level, seconds, attempts):
+        """Count one solve of a sector"""
+        if not 0 <= level < self.array.layout:
+            return
+        self.array.add(self._base(level, TIME) + bucket_of(seconds * 1000))
+        self.array.add(self._base(level, ATTEMPTS) + bucket_of(attempts))
+
+    def counts(self, level, kind):
+        return self.array.values(self._base(level, kind), BUCKETS)
+
+    def summary(self):
+        """Per-sector solves and p50/p90/p99 of seconds and attempts"""
+        sectors = {}
+        for level in range(self.array.layout):
+            attempts = self.counts(level, ATTEMPTS)
+            solved = sum(attempts)
+            if not solved:
+                continue
+            times = percentiles(self.counts(level, TIME))
+            sectors[f"sector_{level + 1}"] = {
+                'solved': solved,
+                'seconds': {f"p{p}": round(ms / 1000, 1) for p, ms in times.items()},
+                'attempts': {f"p{p}": round(value) for p, value in percentiles(attempts).items()},
+            }
+        return sectors
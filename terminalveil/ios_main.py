@@ -61,8 +61,12 @@ class TerminalInput(TextInput):
         self.padding = [10, 10]
         self.history = []
         self.history_index = -1
+        self.write_tab = False  # Tab completes commands instead
         
     def keyboard_on_key_down(self, window, keycode, text, modifiers):
+        if keycode[1] == 'tab':
+            self.text = GameEngine.commands.extend(self.text)
+            return True
         if keycode[1] == 'up':
             if self.history and self.history_index < len(self.history) - 1:
                 self.history_index += 1
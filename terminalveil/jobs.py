@@ -0,0 +1,108 @@
+"""
+Terminal Veil - Asynchronous Scan Jobs
+A submitted scan returns a job ID at once; the outcome is picked up later
+by long-poll or Server-Sent Events. Jobs are idempotent on a client
+request ID, so a retried upload never re-runs detection or counts twice.
+"""
+import secrets
+import threading
+import time
+from concurrent.futures import Future
+
+from terminalveil.metrics import metrics
+
+# Finished jobs are kept this long for late pollers and retried submits
+JOB_TTL = 600
+SWEEP_INTERVAL = 30
+
+
+class Job:
+    __slots__ = ('id', 'session_id', 'request_id', 'future', 'created')
+
+    def __init__(self, session_id, request_id):
+        self.id = secrets.token_urlsafe(12)
+        self.session_id = session_id
+        self.request_id = request_id
+        self.future = Future()  # Resolves to the scan's JSON reply
+        self.created = time.monotonic()
+
+    @property
+    def status(self):
+        return 'done' if self.future.done() else 'pending'
+
+    def to_dict(self):
+        data = {'job_id': self.id, 'status': self.status}
+        if self.future.done():
+            data['result'] = self.future.result()
+        return data
+
+
+class JobStore:
+    def __init__(self, ttl=JOB_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._by_request = {}  # (session_id, request_id) -> job
+        self._last_sweep = time.monotonic()
+
+    def submit(self, session, request_id, start):
+        """
+        Return (job, created). start(job) kicks off the work and must
+        eventually resolve job.future; it is only called for new jobs.
+        An exception from start (e.g. QueueFull) discards the job.
+        """
+        key = (session.id, request_id) if request_id else None
+        with self._lock:
+            self._sweep()
+            if key in self._by_request:
+                metrics.incr('scan_jobs_deduplicated')
+                return self._by_request[key], False
+            job = Job(session.id, request_id)
+            self._jobs[job.id] = job
+            if key:
+                self._by_request[key] = job
+
+        try:
+            start(job)
+        except BaseException as e:
+            # Anyone who raced onto this job sees the failure, not a hang
+            job.future.set_result({'error': str(e)})
+            self._discard(job)
+            raise
+        metrics.incr('scan_jobs_submitted')
+        return job, True
+
+    def get(self, job_id, session_id):
+        """A job, only if it belongs to this session"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.session_id != session_id:
+            return None
+        return job
+
+    def _discard(self, job):
+        with self._lock:
+            self._jobs.pop(job.id, None)
+            if job.request_id:
+                self._by_request.pop((job.session_id, job.request_id), None)
+
+    def _sweep(self):
+        """Forget expired jobs (caller holds the lock)"""
+        now = time.monotonic()
+        if now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        cutoff = now - self.ttl
+        stale = [job for job in self._jobs.values() if job.created < cutoff and job.future.done()]
+        for job in stale:
+            del self._jobs[job.id]
+            if job.request_id:
+                self._by_request.pop((job.session_id, job.request_id), None)
+
+    def __len__(self):
+        return len(self._jobs)
+
+
+def sse_event(event, data):
+    """One Server-Sent Events frame"""
+    return f"event: {event}\ndata: {data}\n\n"
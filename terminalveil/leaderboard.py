@@ -0,0 +1,255 @@
+"""
+Terminal Veil - Leaderboard
+Every completion, ranked by attempts and then time taken, in an
+indexable skiplist: O(log n) insert, rank lookup and page seek. Entries
+are persisted as one JSON object per line in an append-only file that
+every worker process appends to and tails.
+"""
+import json
+import math
+import os
+import random
+import threading
+
+from terminalveil.paths import data_path
+
+try:
+    import fcntl
+except ImportError:  # Windows: single process only
+    fcntl = None
+
+PAGE_SIZE = 10
+DEFAULT_PLAYER = 'anonymous'  # Unnamed players, never taken for one person
+
+
+class _Node:
+    __slots__ = ('key', 'value', 'next', 'width')
+
+    def __init__(self, key, value, levels):
+        self.key = key
+        self.value = value
+        self.next = [None] * levels
+        self.width = [1] * levels
+
+
+class IndexableSkiplist:
+    """Sorted (key, value) pairs with positional access by rank"""
+    MAX_LEVELS = 24  # Plenty for 2**24 entries
+
+    def __init__(self):
+        self.size = 0
+        self.head = _Node(None, None, self.MAX_LEVELS)
+
+    def __len__(self):
+        return self.size
+
+    def insert(self, key, value):
+        """Add after any equal keys; returns the new item's 0-based index"""
+        chain = [None] * self.MAX_LEVELS
+        steps_at_level = [0] * self.MAX_LEVELS
+        node = self.head
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key <= key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        levels = min(self.MAX_LEVELS, 1 - int(math.log(1.0 - random.random(), 2.0)))
+        new = _Node(key, value, levels)
+        steps = 0
+        for level in range(levels):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - steps
+            prev.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, self.MAX_LEVELS):
+            chain[level].width[level] += 1
+        self.size += 1
+        return sum(steps_at_level)
+
+    def rank(self, key):
+        """Number of items with a smaller key"""
+        node = self.head
+        index = 0
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                index += node.width[level]
+                node = node.next[level]
+        return index
+
+    def _node_at(self, index):
+        node = self.head
+        index += 1
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level] is not None and node.width[level] <= index:
+                index -= node.width[level]
+                node = node.next[level]
+        return node
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        return self._node_at(index).value
+
+    def key_at(self, index):
+        return self._node_at(index).key
+
+    def slice(self, start, stop):
+        """Values at indexes [start, stop), walking from one seek"""
+        stop = min(stop, self.size)
+        if start >= stop:
+            return []
+        node = self._node_at(start)
+        values = []
+        for _ in range(stop - start):
+            values.append(node.value)
+            node = node.next[0]
+        return values
+
+
+def _sort_key(entry, seq):
+    time_taken = entry.get('time_taken')
+    return (entry['attempts'], time_taken if time_taken is not None else math.inf, seq)
+
+
+def run_id(key):
+    """A sort key as JSON-safe [attempts, time_taken or None, seq], e.g. for a save"""
+    attempts, time_taken, seq = key
+    return [attempts, None if time_taken == math.inf else time_taken, seq]
+
+
+def _key_of(run):
+    attempts, time_taken, seq = run
+    return (attempts, math.inf if time_taken is None else time_taken, seq)
+
+
+class Leaderboard:
+    def __init__(self, filename='veil_leaderboard.ndjson', seed=None):
+        # seed() returns completions to start a new file from
+        self.filepath = data_path(filename)
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._entries = IndexableSkiplist()
+        self._best = {}  # player name (lowercase) -> best sort key, named players only
+        self._anonymous = False  # Any completion by an unnamed player
+        self._offset = None  # Bytes of the file read so far
+        self.version = 0  # Bumped on every change, for render caches
+
+    def _open(self):
+        # Caller holds self._lock
+        if self._offset is not None:
+            return
+        self._offset = 0
+        if self.seed and not os.path.exists(self.filepath):
+            self._append([dict(entry) for entry in self.seed()])
+
+    def _append(self, entries):
+        """Write entries at the end of the file; returns the offset of the first"""
+        if not entries:
+            return None
+        with open(self.filepath, 'a') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            offset = f.seek(0, os.SEEK_END)
+            f.write(''.join(json.dumps(entry, separators=(',', ':')) + '\n' for entry in entries))
+        return offset
+
+    def _sync(self, find=None):
+        """Read new lines; returns the sort key of the one at byte offset find, if read"""
+        # Caller holds self._lock
+        self._open()
+        try:
+            if os.path.getsize(self.filepath) <= self._offset:
+                return None
+            with open(self.filepath, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return None
+        end = data.rfind(b'\n') + 1  # Leave a half-written line for next time
+        found = None
+        position = self._offset
+        for line in data[:end].splitlines(keepends=True):
+            start, position = position, position + len(line)
+            try:
+                entry = json.loads(line)
+                key = _sort_key(entry, len(self._entries))
+            except (ValueError, KeyError, TypeError):
+                continue
+            self._entries.insert(key, entry)
+            if start == find:
+                found = key
+            player = str(entry.get('player', '')).lower()
+            if player == DEFAULT_PLAYER:
+                self._anonymous = True
+            elif player not in self._best or key < self._best[player]:
+                self._best[player] = key
+        if end:
+            self._offset += end
+            self.version += 1
+        return found
+
+    def refresh(self):
+        """Read entries other processes appended since the last look; returns version"""
+        with self._lock:
+            self._sync()
+            return self.version
+
+    def add(self, entry):
+        """
+        Record a completion; returns (rank, run) for this completion: its
+        1-based rank and its run_id() for rank_of_run(), or (None, None)
+        """
+        with self._lock:
+            key = self._sync(find=self._append([entry]))
+            if key is None:
+                return None, None
+            # Keys end in a unique sequence number, so this is the entry's own position
+            return self._entries.rank(key) + 1, run_id(key)
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return len(self._entries)
+
+    def players(self):
+        with self._lock:
+            self._sync()
+            return len(self._best) + self._anonymous
+
+    def top(self, count=PAGE_SIZE):
+        return self.page(1, count)
+
+    def page(self, number, size=PAGE_SIZE):
+        """[(rank, entry)] for 1-based page number"""
+        with self._lock:
+            self._sync()
+            start = (number - 1) * size
+            return list(enumerate(self._entries.slice(start, start + size), start + 1))
+
+    def pages(self, size=PAGE_SIZE):
+        with self._lock:
+            self._sync()
+            return max(1, math.ceil(len(self._entries) / size))
+
+    def rank_of_run(self, run):
+        """(rank, entry) of the completion add() returned run for, or None"""
+        key = _key_of(run)
+        with self._lock:
+            self._sync()
+            index = self._entries.rank(key)
+            if index >= len(self._entries) or self._entries.key_at(index) != key:
+                return None
+            return index + 1, self._entries[index]
+
+    def rank_of(self, player):
+        """(rank, entry) of a named player's best completion, or None"""
+        with self._lock:
+            self._sync()
+            key = self._best.get(player.lower())
+            if key is None:
+                return None
+            index = self._entries.rank(key)
+            return index + 1, self._entries[index]
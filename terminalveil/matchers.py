@@ -0,0 +1,273 @@
+"""
+Terminal Veil - Requirement Matchers
+Each level's requirement is compiled once into a matcher object, so a
+scan is checked with a single match() call instead of re-reading the
+requirement. Matchers also write the objective, hint and feedback text for
+their level.
+"""
+from collections import namedtuple
+
+from terminalveil.puzzles import LEVELS
+
+# What a scan did: solved the level, added a step to the progress
+# (None if not), or broke the progress so it must be reset
+Verdict = namedtuple('Verdict', ('solved', 'step', 'reset'))
+MISS = Verdict(False, None, False)
+HIT = Verdict(True, None, False)
+RESET = Verdict(False, None, True)
+
+SIGNAL_KEYS = ('color', 'qr_contains', 'shape', 'barcode')  # In display order
+SCAN_TYPES = ('color', 'shape', 'qr', 'barcode')
+
+
+class Signal:
+    """One thing a single scan result must show"""
+    __slots__ = ('kind', 'value')
+
+    def __init__(self, kind, value=None):
+        self.kind = kind  # 'color', 'qr', 'shape' or 'barcode'
+        self.value = value
+
+    def matches(self, result):
+        if result.get('type') != self.kind:
+            return False
+        if self.kind == 'qr':
+            return self.value in result.get('data', '')
+        if self.kind in ('color', 'shape'):
+            return result.get(self.kind) == self.value
+        return True
+
+    def objective(self):
+        if self.kind == 'qr':
+            return f"QR: '{self.value}'"
+        if self.kind == 'barcode':
+            return "Any barcode"
+        return f"{self.value.upper()} {self.kind}"
+
+    def need(self):
+        if self.kind == 'qr':
+            return f"QR with '{self.value}'"
+        if self.kind == 'barcode':
+            return "Barcode"
+        return f"{self.value.upper()} {self.kind}"
+
+    def feedback(self):
+        if self.kind == 'qr':
+            return f"QR '{self.value}'"
+        if self.kind == 'barcode':
+            return "barcode"
+        return f"{self.value.upper()} {self.kind}"
+
+    def step_name(self):
+        return f"QR '{self.value}'" if self.kind == 'qr' else self.value.upper()
+
+
+def _signal(key, value):
+    return Signal('qr' if key == 'qr_contains' else key, None if key == 'barcode' else value)
+
+
+class Matcher:
+    """Base class: match() a scan result against the level's progress"""
+    sequence = False  # Progress is a run of steps that a wrong scan resets
+
+    def match(self, result, progress):
+        return MISS
+
+    def objectives(self):
+        return []
+
+    def describe(self, progress):
+        """Progress block and objectives for the sector description"""
+        return ''.join(f"[OBJECTIVE] {line}\n" for line in self.objectives())
+
+    def hint(self, progress):
+        """Words for the 'scan' command"""
+        return []
+
+    def feedback(self, progress):
+        """Added to 'Analysis complete.' after a scan that did not solve the level"""
+        return ''
+
+
+class AnyMatcher(Matcher):
+    def match(self, result, progress):
+        return HIT if result.get('type') in SCAN_TYPES else MISS
+
+    def objectives(self):
+        return ["Scan anything"]
+
+    def hint(self, progress):
+        return ["Scan any object."]
+
+
+class SignalsMatcher(Matcher):
+    """One or more signals, all of which one scan result must show"""
+
+    def __init__(self, signals):
+        self.signals = signals
+
+    def match(self, result, progress):
+        if self.signals and all(signal.matches(result) for signal in self.signals):
+            return HIT
+        return MISS
+
+    def objectives(self):
+        kinds = {signal.kind for signal in self.signals}
+        return [signal.objective() for signal in self.signals
+                # A color that goes with a shape or barcode is not listed on its own
+                if not (signal.kind == 'color' and kinds & {'shape', 'barcode'})]
+
+    def hint(self, progress):
+        return [f"Need: {signal.need()}" for signal in self.signals]
+
+    def feedback(self, progress):
+        if not self.signals:
+            return ''
+        return f" Lock engaged. Need: {', '.join(signal.feedback() for signal in self.signals)}"
+
+
+class SequenceMatcher(Matcher):
+    """Shapes in order; any other scan resets the run"""
+    sequence = True
+
+    def __init__(self, shapes):
+        self.shapes = shapes
+
+    def match(self, result, progress):
+        if result.get('type') != 'shape' or len(progress) >= len(self.shapes):
+            return RESET
+        detected = result.get('shape', '').lower()
+        if detected != self.shapes[len(progress)]:
+            return RESET
+        return Verdict(len(progress) + 1 == len(self.shapes), detected, False)
+
+    def describe(self, progress):
+        done, total = len(progress), len(self.shapes)
+        text = f"[PROGRESS] {done}/{total} steps completed\n"
+        if progress:
+            text += f"[COMPLETED] {' → '.join(progress)}\n"
+        text += f"[NEXT] {self.shapes[done] if done < total else 'COMPLETE'}\n\n"
+        return text + super().describe(progress)
+
+    def objectives(self):
+        return [f"Sequence: {' → '.join(self.shapes)}"]
+
+    def hint(self, progress):
+        hints = ["SEQUENCE: Scan in exact order!", f"Progress: {len(progress)}/{len(self.shapes)}"]
+        if len(progress) < len(self.shapes):
+            hints.append(f"Next: {self.shapes[len(progress)]}")
+        return hints
+
+    def feedback(self, progress):
+        return f" Progress: {len(progress)}/{len(self.shapes)}"
+
+
+class ComplexSequenceMatcher(Matcher):
+    """Signals of mixed kinds in order; a wrong scan resets the run"""
+    sequence = True
+
+    def __init__(self, steps):
+        self.steps = steps
+
+    def match(self, result, progress):
+        if len(progress) >= len(self.steps):
+            return MISS
+        if not self.steps[len(progress)].matches(result):
+            return RESET
+        step = {'type': result['type'],
+                'value': result.get('data') or result.get('color') or result.get('shape')}
+        return Verdict(len(progress) + 1 == len(self.steps), step, False)
+
+    def describe(self, progress):
+        text = f"[PROGRESS] {len(progress)}/{len(self.steps)} ritual steps\n"
+        if progress:
+            performed = [p.get('type', '?') if isinstance(p, dict) else str(p) for p in progress]
+            text += f"[PERFORMED] {' → '.join(performed)}\n"
+        return text + "\n" + super().describe(progress)
+
+    def objectives(self):
+        return [f"{len(self.steps)}-part ritual (check progress above)"]
+
+    def hint(self, progress):
+        steps = ' → '.join(f"{i}. {step.step_name()}" for i, step in enumerate(self.steps, 1))
+        return [f"{len(self.steps)}-PART RITUAL. Write it down:", steps]
+
+    def feedback(self, progress):
+        return f" Progress: {len(progress)}/{len(self.steps)}"
+
+
+class SimultaneousMatcher(Matcher):
+    """Two signals in one frame"""
+
+    def __init__(self, items):
+        self.items = items
+
+    def match(self, result, progress):
+        # The camera cannot yet report both at once, so either one passes
+        if result.get('type') == 'barcode':
+            return HIT
+        if result.get('type') == 'color' and result.get('color') == 'red':
+            return HIT
+        return MISS
+
+    def objectives(self):
+        return [f"SIMULTANEOUS: {self.items[0].upper()} + {self.items[1].upper()}"]
+
+    def hint(self, progress):
+        return [f"SIMULTANEOUS: {self.items[0].upper()} + {self.items[1].upper()} in ONE frame!"]
+
+    def feedback(self, progress):
+        return f" Need BOTH: {self.items[0].upper()} + {self.items[1].upper()} in ONE frame!"
+
+
+class RandomizedMatcher(Matcher):
+    """The signal in the level's actual_requirement, told to the player once they scan"""
+
+    def __init__(self, actual):
+        kind = actual.get('type')
+        self.signal = Signal(kind, actual.get('value')) if kind in ('color', 'shape', 'qr') else None
+
+    def match(self, result, progress):
+        return HIT if self.signal and self.signal.matches(result) else MISS
+
+    def objectives(self):
+        return ["Scan to discover requirement"]
+
+    def feedback(self, progress):
+        return f" Signature required: {self.signal.feedback()}" if self.signal else ''
+
+
+def compile_level(level):
+    """The matcher for a level's requirement"""
+    req = level.get('requirement', {})
+    if req.get('any'):
+        return AnyMatcher()
+    if 'sequence' in req:
+        return SequenceMatcher(list(req['sequence']))
+    if 'simultaneous' in req:
+        return SimultaneousMatcher(list(req['simultaneous']))
+    if 'complex_sequence' in req:
+        return ComplexSequenceMatcher([
+            Signal(step['type'], step.get('contains', step.get('value')))
+            for step in req['complex_sequence']
+        ])
+    if req.get('randomized'):
+        return RandomizedMatcher(level.get('actual_requirement', {}))
+    return SignalsMatcher([_signal(key, req[key]) for key in SIGNAL_KEYS if key in req])
+
+
+# id(level) -> (level, matcher). Levels are immutable and live as long as
+# the process (see puzzles.randomize_levels), so each compiles only once.
+_matchers = {}
+
+
+def matcher_for(level):
+    """The compiled matcher for a level"""
+    cached = _matchers.get(id(level))
+    if cached is None or cached[0] is not level:
+        cached = _matchers[id(level)] = (level, compile_level(level))
+    return cached[1]
+
+
+for _level in LEVELS:
+    matcher_for(_level)
@@ -0,0 +1,52 @@
+"""
+Terminal Veil - Server Metrics
+Process-wide counters, gauges and timings exported by /metrics
+"""
+import threading
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._timings = {}  # name -> [count, total, max]
+
+    def incr(self, name, amount=1):
+        """Add to a monotonically increasing counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        """Record the current value of something that goes up and down"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name, seconds):
+        """Record one duration sample"""
+        with self._lock:
+            timing = self._timings.setdefault(name, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    def snapshot(self):
+        """Copy of every metric, safe to serialize"""
+        with self._lock:
+            timings = {
+                name: {
+                    'count': count,
+                    'avg_ms': round(total / count * 1000, 3) if count else 0,
+                    'max_ms': round(peak * 1000, 3)
+                }
+                for name, (count, total, peak) in self._timings.items()
+            }
+            return {
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'timings': timings
+            }
+
+
+# Shared by every module in this process
+metrics = Metrics()
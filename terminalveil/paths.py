@@ -0,0 +1,21 @@
+"""
+Terminal Veil - Data Paths
+Where saves, analytics and the other data files live: the app storage
+directory on Android, the home directory everywhere else
+"""
+import os
+
+_data_dir = None
+
+
+def data_path(filename):
+    """The path of a data file (or directory) named filename"""
+    # The platform lookup (an import attempt) runs once, not per file
+    global _data_dir
+    if _data_dir is None:
+        try:
+            from android.storage import app_storage_path
+            _data_dir = app_storage_path()
+        except ImportError:
+            _data_dir = os.path.expanduser('~')
+    return os.path.join(_data_dir, filename)
@@ -1,9 +1,12 @@
 """
 Terminal Veil - Level Definitions with Easter Eggs and Extreme Difficulty
+LEVELS is frozen at import: read-only level mappings shared by every
+session. A game's randomized fields (sector 2's color, sector 8's
+signature) come from its seed as a small overlay of replacement levels.
 """
-import random
+from types import MappingProxyType
 
-LEVELS = [
+_LEVEL_DATA = [
     {
         'id': 0,
         'name': 'Calibration',
@@ -145,17 +148,57 @@ LEVELS = [
     }
 ]
 
-def randomize_levels():
-    colors = ['red', 'blue', 'green', 'yellow']
-    c1 = random.choice(colors)
-    LEVELS[1]['requirement'] = {'color': c1}
-    LEVELS[1]['name'] = f"The {c1.title()} Gate"
-    LEVELS[1]['intro'] = f"The firewall demands sacrifice.\nA {c1.upper()} chromatic signature is required."
-    
-    LEVELS[7]['actual_requirement'] = {
-        'type': random.choice(['color', 'shape', 'qr']),
-        'value': random.choice(['green', 'square', 'FINAL-99'])
-    }
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+LEVELS = tuple(_freeze(level) for level in _LEVEL_DATA)
+del _LEVEL_DATA
+
+GATE_COLORS = ('red', 'blue', 'green', 'yellow')
+FINAL_SIGNATURES = (('color', 'green'), ('shape', 'square'), ('qr', 'FINAL-99'))
+
+# (gate color, final signature) -> overlay; there are only a dozen
+_overlays = {}
+
+
+def _overlay(level, **fields):
+    return _freeze({**level, **fields})
+
+
+def randomize_levels(seed):
+    """
+    {level index: level} replacing the randomized levels for a game's seed.
+    Overlays are built once and shared, so a game only keeps its seed.
+    """
+    choice = (GATE_COLORS[seed % len(GATE_COLORS)],
+              FINAL_SIGNATURES[seed // len(GATE_COLORS) % len(FINAL_SIGNATURES)])
+    overlay = _overlays.get(choice)
+    if overlay is None:
+        color, (kind, value) = choice
+        overlay = _overlays.setdefault(choice, MappingProxyType({
+            1: _overlay(
+                LEVELS[1],
+                requirement={'color': color},
+                name=f"The {color.title()} Gate",
+                intro=f"The firewall demands sacrifice.\nA {color.upper()} chromatic signature is required.",
+                hint=f"Find something {color}.",
+            ),
+            7: _overlay(LEVELS[7], actual_requirement={'type': kind, 'value': value}),
+        }))
+    return overlay
+
+
+def get_level(index, seed=None):
+    """Level at index as a game with this seed sees it"""
+    if seed is None:
+        return LEVELS[index]
+    return randomize_levels(seed).get(index, LEVELS[index])
 
 def get_level_difficulty(level_id):
     mapping = {
@@ -0,0 +1,101 @@
+"""
+Terminal Veil - Rate Limiting
+Token buckets keyed by session and client IP. Scans are charged by
+estimated CV cost before any image decoding happens.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from terminalveil.admission import Backpressure
+from terminalveil.metrics import metrics
+
+
+class RateLimited(Backpressure):
+    """Raised when a session or IP has spent its budget"""
+    message = 'Signal budget exhausted. Slow down.'
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, capacity, now):
+        self.tokens = capacity
+        self.updated = now
+
+
+class RateLimiter:
+    """
+    One token bucket per key. Buckets refill at `refill` tokens per second
+    up to `capacity`; the least recently used are dropped past max_keys.
+    """
+
+    def __init__(self, capacity, refill, max_keys=100000):
+        self.capacity = capacity
+        self.refill = refill
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def _bucket(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.capacity, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(self.capacity, bucket.tokens + (now - bucket.updated) * self.refill)
+            bucket.updated = now
+        return bucket
+
+    def take(self, key, cost):
+        """Spend cost tokens; return 0 on success or seconds until affordable"""
+        # Anything dearer than a full bucket costs exactly a full bucket
+        cost = min(cost, self.capacity)
+        with self._lock:
+            bucket = self._bucket(key, time.monotonic())
+            if bucket.tokens >= cost:
+                bucket.tokens -= cost
+                return 0
+            if self.refill <= 0:
+                return math.inf
+            return (cost - bucket.tokens) / self.refill
+
+    def refund(self, key, cost):
+        cost = min(cost, self.capacity)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.tokens = min(self.capacity, bucket.tokens + cost)
+
+
+class Budget:
+    """A per-session limiter and an optional per-IP limiter charged together"""
+
+    def __init__(self, name, per_session, per_ip=None):
+        self.name = name
+        self.limits = [per_session] + ([per_ip] if per_ip else [])
+
+    def charge(self, session_id, client_ip, cost):
+        """
+        Spend cost from every bucket or none of them; raise RateLimited.
+        Returns a callable that gives the tokens back.
+        """
+        keys = [session_id, client_ip]
+        spent = []
+        for limiter, key in zip(self.limits, keys):
+            wait = limiter.take(key, cost)
+            if wait:
+                for done, done_key in spent:
+                    done.refund(done_key, cost)
+                metrics.incr(f'{self.name}_rate_limited')
+                raise RateLimited(max(1, math.ceil(min(wait, 3600))))
+            spent.append((limiter, key))
+        return lambda: self.refund(session_id, client_ip, cost)
+
+    def refund(self, session_id, client_ip, cost):
+        """Give back a charge whose work never ran"""
+        for limiter, key in zip(self.limits, [session_id, client_ip]):
+            limiter.refund(key, cost)
@@ -1,35 +1,260 @@
 """
 Terminal Veil - Save System
+Saves live in one SQLite database keyed by slot (a web session ID, or
+'local' for the single-player apps). A slot is a state snapshot plus the
+game events appended after it (see events.py). The old single-file JSON
+save is migrated into the local slot the first time it is loaded.
 """
 import json
 import os
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
 
-class SaveManager:
-    def __init__(self, filename='veil_save.json'):
-        self.filepath = os.path.join(os.path.expanduser('~'), filename)
-        try:
-            from android.storage import app_storage_path
-            self.filepath = os.path.join(app_storage_path(), filename)
-        except ImportError:
-            pass
-    
-    def save(self, state):
+from terminalveil import state_codec
+from terminalveil.events import SNAPSHOT_EVERY, new_state, replay
+from terminalveil.paths import data_path
+
+LOCAL_SLOT = 'local'
+
+
+def _valid(state):
+    return isinstance(state, Mapping) and 'current_level' in state and 'inventory' in state
+
+
+class SQLiteSaveStore:
+    """
+    Indexed save storage in a WAL-mode database: one snapshot row per
+    slot and an append-only event table keyed by (slot, seq).
+    Each thread keeps its own connection, whose statement cache reuses
+    the prepared statements below.
+    """
+
+    def __init__(self, filename='veil_saves.db'):
+        self.filepath = data_path(filename)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS saves (
+                slot TEXT PRIMARY KEY,
+                state BLOB NOT NULL,
+                updated REAL NOT NULL,
+                seq INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS events (
+                slot TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                data TEXT NOT NULL,
+                ts REAL NOT NULL,
+                PRIMARY KEY (slot, seq)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            ) WITHOUT ROWID;
+        ''')
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(saves)')]
+        if 'seq' not in columns:
+            # Databases created before saves were snapshots
+            conn.execute('ALTER TABLE saves ADD COLUMN seq INTEGER NOT NULL DEFAULT 0')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.filepath, timeout=10, cached_statements=64,
+                                   isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def encode(state):
+        """Serialize a state for storage (snapshot it before it changes)"""
+        return state_codec.encode(state)
+
+    @staticmethod
+    def decode(data):
+        # Rows written before the binary format hold JSON text
+        return state_codec.decode(data)
+
+    def write_batch(self, snapshots=(), events=()):
+        """
+        Atomically store snapshots [(slot, encoded_state, seq)] and
+        append events [(slot, seq, kind, data)] in one transaction.
+        """
+        conn = self._conn()
+        now = time.time()
         try:
-            with open(self.filepath, 'w') as f:
-                json.dump(state, f)
+            conn.execute('BEGIN')
+            if events:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO events (slot, seq, kind, data, ts) VALUES (?, ?, ?, ?, ?)',
+                    [(slot, seq, kind, json.dumps(data), now) for slot, seq, kind, data in events]
+                )
+            if snapshots:
+                conn.executemany(
+                    'INSERT INTO saves (slot, state, updated, seq) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(slot) DO UPDATE SET state = excluded.state, '
+                    'updated = excluded.updated, seq = excluded.seq',
+                    [(slot, data, now, seq) for slot, data, seq in snapshots]
+                )
+            conn.execute('COMMIT')
             return True
         except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
             print(f"Save error: {e}")
             return False
-    
-    def load(self):
-        if not os.path.exists(self.filepath):
-            return None
+
+    def save(self, slot, state, seq=0):
+        """Atomically replace a slot's snapshot"""
+        return self.write_batch(snapshots=[(slot, self.encode(state), seq)])
+
+    def events(self, slot, after=0):
+        """Yield (seq, kind, data, ts) for a slot's events after seq, in order"""
+        cursor = self._conn().execute(
+            'SELECT seq, kind, data, ts FROM events WHERE slot = ? AND seq > ? ORDER BY seq',
+            (slot, after)
+        )
+        for seq, kind, data, ts in cursor:
+            yield seq, kind, json.loads(data), ts
+
+    def has_slot(self, slot):
+        """True if slot has a snapshot or any events"""
+        try:
+            return self._conn().execute(
+                'SELECT 1 FROM saves WHERE slot = ? UNION ALL '
+                'SELECT 1 FROM events WHERE slot = ? LIMIT 1', (slot, slot)
+            ).fetchone() is not None
+        except Exception as e:
+            print(f"Load error: {e}")
+            return False
+
+    def load(self, slot, pending=(None, ())):
+        """
+        Snapshot plus replayed tail: (state, seq), or (None, 0) if empty.
+        pending is a SaveWriter's (snapshot, events) for the slot, newer
+        than or overlapping what is on disk.
+        """
         try:
-            with open(self.filepath, 'r') as f:
-                state = json.load(f)
-            if 'current_level' in state and 'inventory' in state:
-                return state
+            row = self._conn().execute(
+                'SELECT state, seq FROM saves WHERE slot = ?', (slot,)
+            ).fetchone()
+            snapshot, queued = pending
+            if snapshot and (row is None or snapshot[1] >= row[1]):
+                row = snapshot
+            if row:
+                state, seq = self.decode(row[0]), row[1]
+                if not _valid(state):
+                    return None, 0
+            else:
+                state, seq = None, 0
+
+            tail = [(seq_, kind, data) for seq_, kind, data, _ in self.events(slot, after=seq)]
+            # Queued events past the disk's, which a batch may have written meanwhile
+            last = tail[-1][0] if tail else seq
+            tail.extend((seq_, kind, data) for _, seq_, kind, data in queued if seq_ > last)
+            if tail:
+                if state is None:
+                    state = new_state()
+                replay(state, ((kind, data) for _, kind, data in tail))
+                seq = tail[-1][0]
+            return state, seq
         except Exception as e:
             print(f"Load error: {e}")
-        return None
+        return None, 0
+
+    def migrate_json(self, json_path, slot):
+        """
+        Import a legacy JSON save into slot, once per database.
+        Returns the imported state, or None.
+        """
+        conn = self._conn()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            done = conn.execute(
+                "SELECT 1 FROM meta WHERE key = 'json_migrated'"
+            ).fetchone()
+            state = None
+            if not done and os.path.exists(json_path):
+                with open(json_path, 'rb') as f:
+                    state = self.decode(f.read())
+                if _valid(state):
+                    conn.execute(
+                        'INSERT OR IGNORE INTO saves (slot, state, updated) VALUES (?, ?, ?)',
+                        (slot, self.encode(state), time.time())
+                    )
+                else:
+                    state = None
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)",
+                         (json_path,))
+            conn.execute('COMMIT')
+            return state
+        except Exception as e:
+            conn.execute('ROLLBACK')
+            print(f"Migration error: {e}")
+            return None
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def default_store():
+    """The process-wide save database"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SQLiteSaveStore()
+        return _default_store
+
+
+class SaveManager:
+    """
+    Save/load for one slot of the save database. record() appends a game
+    event and save() writes a snapshot; with a SaveWriter both only queue
+    the work and the writes happen in the background.
+    """
+
+    def __init__(self, filename='veil_save.json', slot=LOCAL_SLOT, store=None, writer=None, fresh=False):
+        # filename is the legacy JSON save, read once for migration
+        self.filepath = data_path(filename)
+        self.slot = slot
+        self.store = store or (writer.store if writer else default_store())
+        self.writer = writer
+        self.seq = 0  # Last event number in this slot
+        self.snapshot_seq = 0
+        self.fresh = fresh  # A just-minted slot: nothing to load yet
+
+    def record(self, kind, data, state):
+        """Append one event; snapshots state every SNAPSHOT_EVERY events"""
+        self.seq += 1
+        event = (self.slot, self.seq, kind, data)
+        if self.writer:
+            self.writer.append(event)
+        else:
+            self.store.write_batch(events=[event])
+        if self.seq - self.snapshot_seq >= SNAPSHOT_EVERY:
+            self.save(state)
+
+    def save(self, state):
+        self.snapshot_seq = self.seq
+        if self.writer:
+            return self.writer.submit(self.slot, state, self.seq)
+        return self.store.save(self.slot, state, self.seq)
+
+    def load(self):
+        if self.fresh and not self.seq:
+            return None
+        # Queued writes for this slot count; the snapshot of them is taken
+        # before the disk read, so a batch committing in between is seen once
+        pending = self.writer.pending(self.slot) if self.writer else (None, ())
+        state, seq = self.store.load(self.slot, pending)
+        if state is None and self.slot == LOCAL_SLOT:
+            state = self.store.migrate_json(self.filepath, self.slot)
+        if state is not None:
+            self.seq = self.snapshot_seq = seq
+        return state
@@ -0,0 +1,149 @@
+"""
+Terminal Veil - Write-Behind Saves
+Snapshots and game events are queued per slot; a background thread
+writes them in batched transactions. Repeated snapshots of one slot
+inside the debounce window collapse into a single write, events are
+appended in the same transaction, and nothing waits longer than max_lag
+seconds to reach disk.
+"""
+import atexit
+import threading
+import time
+
+from terminalveil.metrics import metrics
+
+
+class _Pending:
+    __slots__ = ('snapshot', 'events', 'first', 'last')
+
+    def __init__(self, now):
+        self.snapshot = None  # (encoded_state, seq)
+        self.events = []
+        self.first = self.last = now
+
+
+class SaveWriter:
+    def __init__(self, store, debounce=2.0, max_lag=10.0):
+        self.store = store
+        self.debounce = debounce
+        self.max_lag = max_lag
+        self._cond = threading.Condition()
+        self._pending = {}  # slot -> _Pending
+        self._writing = {}  # slot -> [_Pending] taken for a batch and not yet committed
+        self._thread = threading.Thread(target=self._run, name='veil-save-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _entry(self, slot, now):
+        entry = self._pending.get(slot)
+        if entry is None:
+            entry = self._pending[slot] = _Pending(now)
+            self._cond.notify()
+        else:
+            entry.last = now
+        return entry
+
+    def submit(self, slot, state, seq=0):
+        """Snapshot state for slot and schedule its write; never touches disk"""
+        data = self.store.encode(state)
+        with self._cond:
+            entry = self._entry(slot, time.monotonic())
+            if entry.snapshot is not None:
+                metrics.incr('saves_coalesced')
+            entry.snapshot = (data, seq)
+            metrics.set_gauge('saves_pending', len(self._pending))
+        return True
+
+    def append(self, event):
+        """Queue one (slot, seq, kind, data) event for the next batch"""
+        with self._cond:
+            self._entry(event[0], time.monotonic()).events.append(event)
+            metrics.set_gauge('saves_pending', len(self._pending))
+
+    def pending(self, slot):
+        """
+        (snapshot, events) queued for slot that may not be on disk yet,
+        including a batch being written right now: the latest
+        (encoded_state, seq) or None, and its events in seq order
+        """
+        with self._cond:
+            entries = self._writing.get(slot, []) + [self._pending.get(slot)]
+            entries = [entry for entry in entries if entry]
+            snapshot = None
+            for entry in entries:
+                snapshot = entry.snapshot or snapshot
+            return snapshot, [event for entry in entries for event in entry.events]
+
+    def has_slot(self, slot):
+        """True if slot has a save, on disk or still queued"""
+        with self._cond:
+            if slot in self._pending or slot in self._writing:
+                return True
+        return self.store.has_slot(slot)
+
+    def _due_at(self, entry):
+        return min(entry.last + self.debounce, entry.first + self.max_lag)
+
+    def _take_due(self, now, everything=False):
+        due = [slot for slot, entry in self._pending.items()
+               if everything or self._due_at(entry) <= now]
+        batch = [(slot, self._pending.pop(slot)) for slot in due]
+        for slot, entry in batch:
+            self._writing.setdefault(slot, []).append(entry)
+        return batch
+
+    def _done(self, batch):
+        for slot, entry in batch:
+            writing = self._writing[slot]
+            writing.remove(entry)
+            if not writing:
+                del self._writing[slot]
+
+    def _write(self, batch):
+        if not batch:
+            return
+        snapshots = [(slot, entry.snapshot[0], entry.snapshot[1])
+                     for slot, entry in batch if entry.snapshot]
+        events = [event for _, entry in batch for event in entry.events]
+        if self.store.write_batch(snapshots, events):
+            now = time.monotonic()
+            for _, entry in batch:
+                metrics.observe('save_lag', now - entry.first)
+            metrics.incr('saves_written', len(snapshots))
+            metrics.incr('events_written', len(events))
+            with self._cond:
+                self._done(batch)
+        else:
+            metrics.incr('save_failures', len(batch))
+            # Merge them back in front of anything newer and retry after a debounce
+            now = time.monotonic()
+            with self._cond:
+                for slot, entry in batch:
+                    newer = self._pending.get(slot)
+                    if newer:
+                        entry.events.extend(newer.events)
+                        entry.snapshot = newer.snapshot or entry.snapshot
+                    entry.first = entry.last = now
+                    self._pending[slot] = entry
+                self._done(batch)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                now = time.monotonic()
+                next_due = min(self._due_at(entry) for entry in self._pending.values())
+                if next_due > now:
+                    self._cond.wait(next_due - now)
+                    continue
+                batch = self._take_due(now)
+                metrics.set_gauge('saves_pending', len(self._pending))
+            self._write(batch)
+
+    def flush(self):
+        """Write everything pending now (shutdown, tests)"""
+        with self._cond:
+            batch = self._take_due(time.monotonic(), everything=True)
+            metrics.set_gauge('saves_pending', 0)
+        self._write(batch)
@@ -0,0 +1,152 @@
+"""
+Terminal Veil - Web Scan Pipeline
+Shared by the WSGI (app_sync.py) and ASGI (app.py) servers:
+image decoding, frame analysis and the JSON outcome of a scan.
+"""
+import base64
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from terminalveil.admission import scan_priority
+from terminalveil.camera_handler import CHEAP_DETECTORS
+from terminalveil.matchers import Matcher, matcher_for
+from terminalveil.metrics import metrics
+
+
+def decode_data_url(image_data):
+    """Strip a "data:image/...;base64," prefix and return raw bytes"""
+    if ',' in image_data:
+        image_data = image_data.split(',')[1]
+    return base64.b64decode(image_data)
+
+
+def decode_image(image_bytes):
+    """Decode PNG/JPEG bytes into a BGR frame for OpenCV"""
+    image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+    return cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+
+
+def level_requirement(engine):
+    level = engine.get_current_level()
+    return level.get('requirement', {}) if level else {}
+
+
+def analyze_image(analyzer, image_bytes, req, mode='any', cheap=False):
+    """
+    Decode and analyze one image (CPU-bound, run off the request loop).
+    req is the current level's requirement, read beforehand so this
+    never touches the engine. cheap limits 'any' scans to CHEAP_DETECTORS.
+    """
+    image = decode_image(image_bytes)
+
+    # For simultaneous detection (Level 11), try to detect multiple things
+    if req.get('simultaneous'):
+        return analyzer.analyze_frame_simultaneous(image, req['simultaneous'])
+    return analyzer.analyze_frame(image, mode, detectors=CHEAP_DETECTORS if cheap else None)
+
+
+def estimate_scan_cost(image_bytes, req, mode='any'):
+    """
+    Megapixel-detectors a scan will cost. Only the image header is read,
+    so this is cheap enough to charge before any decoding.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        width, height = image.size
+    if req.get('simultaneous'):
+        detectors = len(req['simultaneous'])
+    elif mode == 'any':
+        detectors = 4
+    else:
+        detectors = 1
+    return max(1.0, width * height / 1e6 * detectors)
+
+
+def submit_scan(queue, session, image_bytes, mode='any', upload=False, charge=None):
+    """
+    Queue analysis of an image against the session's current level.
+    charge(cost), if given, is billed the estimated cost first and may
+    raise RateLimited; it returns a refund() used if the queue sheds the
+    scan. Returns a Future of the detection result; raises QueueFull when
+    shed.
+    """
+    with session.lock:
+        req = level_requirement(session.engine)
+
+    refund = charge(estimate_scan_cost(image_bytes, req, mode)) if charge is not None else None
+
+    cheap = mode == 'any' and queue.degraded
+    try:
+        future = queue.submit(analyze_image, session.analyzer, image_bytes, req, mode, cheap,
+                              priority=scan_priority(mode, upload))
+    except Exception:
+        # Nothing ran; don't bill the player for the scan they must retry
+        if refund:
+            refund()
+        raise
+    if cheap:
+        metrics.incr('scans_degraded')
+    return future
+
+
+def scan_job_starter(queue, session, image_bytes, mode='any', upload=False, charge=None):
+    """start() for JobStore.submit: queue the scan, resolve the job with its outcome"""
+    def start(job):
+        future = submit_scan(queue, session, image_bytes, mode, upload, charge)
+
+        def finish(done):
+            try:
+                result = done.result()
+                with session.lock:
+                    outcome = scan_outcome(session.engine, result)
+            except Exception as e:
+                outcome = {'error': str(e)}
+            job.future.set_result(outcome)
+
+        future.add_done_callback(finish)
+    return start
+
+
+def scan_outcome(engine, result):
+    """
+    Apply an analysis result to the game and build the JSON reply.
+    Mutates engine state, so callers hold the session lock.
+    """
+    if 'error' in result:
+        return {'error': result['error']}
+
+    success = engine.check_puzzle_solution(result)
+    result_text = engine.process_scan_result(result, add_to_inventory=success)
+
+    if success:
+        advance_text = engine.advance_level()
+        return {
+            'success': True,
+            'result': result_text,
+            'advance': advance_text,
+            'level': engine.state['current_level'] + 1,
+            'total_levels': 13,
+            'reset': False
+        }
+
+    level = engine.get_current_level()
+    matcher = matcher_for(level) if level else Matcher()
+    progress = engine.state['scans_this_level']
+
+    # Check if sequence was reset
+    was_reset = bool(len(progress) == 0 and matcher.sequence
+                     and engine.state['attempts_count'].get(engine.state['current_level'], 0) > 0)
+
+    if was_reset:
+        feedback = "[RESET] Sequence broken! Starting over."
+    else:
+        feedback = "Analysis complete." + matcher.feedback(progress)
+
+    return {
+        'success': False,
+        'result': result_text,
+        'hint': feedback,
+        'reset': was_reset
+    }
@@ -0,0 +1,161 @@
+"""
+Terminal Veil - Web Session Store
+Sharded map of live player sessions keyed by random IDs
+"""
+import secrets
+import string
+import threading
+import time
+
+# Idle sessions in a shard are swept once per this many inserts into it
+SWEEP_EVERY = 64
+
+ID_LENGTH = 32  # token_urlsafe(24)
+ID_CHARS = frozenset(string.ascii_letters + string.digits + '-_')
+
+
+class Session:
+    """One browser's game: engine, analyzer and a lock for its state."""
+    __slots__ = ('id', 'engine', 'analyzer', 'lock', 'last_activity')
+
+    def __init__(self, session_id, engine, analyzer):
+        self.id = session_id
+        self.engine = engine
+        self.analyzer = analyzer
+        self.lock = threading.RLock()
+        self.last_activity = time.monotonic()
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+
+class _Shard:
+    __slots__ = ('lock', 'sessions', 'inserts')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.inserts = 0
+
+
+class SessionStore:
+    """
+    Sessions split across independently locked shards.
+    A cookie only maps to a session if the ID was issued here and has not
+    been idle for longer than max_idle seconds, or if restorable(id) says
+    its game is still saved (after a restart or an idle sweep).
+    engine_factory is called with the session ID (its save slot) and
+    whether that ID was just minted.
+    """
+
+    def __init__(self, engine_factory, analyzer_factory, shards=16, max_idle=604800,
+                 restorable=None):
+        self.engine_factory = engine_factory
+        self.analyzer_factory = analyzer_factory
+        self.max_idle = max_idle
+        self.restorable = restorable
+        self._shards = [_Shard() for _ in range(shards)]
+
+    @staticmethod
+    def new_id():
+        """192 bits from the OS CSPRNG, URL/cookie safe"""
+        return secrets.token_urlsafe(24)
+
+    @staticmethod
+    def well_formed(session_id):
+        """True if session_id could have come from new_id()"""
+        return (isinstance(session_id, str) and len(session_id) == ID_LENGTH
+                and all(char in ID_CHARS for char in session_id))
+
+    def _shard(self, session_id):
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def _expired(self, session, now):
+        return now - session.last_activity > self.max_idle
+
+    def get(self, session_id):
+        """Return the live session for this ID, or None if unknown/expired"""
+        if not session_id:
+            return None
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = shard.sessions.get(session_id)
+            if session is None:
+                return None
+            now = time.monotonic()
+            if self._expired(session, now):
+                del shard.sessions[session_id]
+                return None
+            session.last_activity = now
+            return session
+
+    def _insert(self, shard, session):
+        """Add session to its shard (caller holds the shard lock)"""
+        shard.inserts += 1
+        if shard.inserts % SWEEP_EVERY == 0:
+            self._sweep(shard)
+        shard.sessions[session.id] = session
+        return session
+
+    def create(self):
+        """Create a session under a fresh, unused ID"""
+        session_id = self.new_id()
+        # Build the game outside any shard lock
+        engine = self.engine_factory(session_id, True)
+        analyzer = self.analyzer_factory()
+        while True:
+            shard = self._shard(session_id)
+            with shard.lock:
+                if session_id in shard.sessions:
+                    # 192-bit IDs never collide in practice; draw again if so
+                    session_id = self.new_id()
+                    engine = self.engine_factory(session_id, True)
+                    continue
+                return self._insert(shard, Session(session_id, engine, analyzer))
+
+    def restore(self, session_id):
+        """Bring back a session whose game is saved, or None if it is not"""
+        if not (self.restorable and self.well_formed(session_id) and self.restorable(session_id)):
+            return None
+        engine = self.engine_factory(session_id, False)
+        analyzer = self.analyzer_factory()
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = shard.sessions.get(session_id)
+            if session is not None and not self._expired(session, time.monotonic()):
+                return session  # Another request restored it first
+            return self._insert(shard, Session(session_id, engine, analyzer))
+
+    def get_or_create(self, session_id):
+        """
+        Return (session, created). Unknown or expired IDs are restored if
+        their game is saved, and otherwise get a new session.
+        """
+        session = self.get(session_id) or self.restore(session_id)
+        if session is not None:
+            return session, False
+        return self.create(), True
+
+    def remove(self, session_id):
+        shard = self._shard(session_id)
+        with shard.lock:
+            return shard.sessions.pop(session_id, None) is not None
+
+    def _sweep(self, shard):
+        """Drop idle sessions from one shard (caller holds its lock)"""
+        now = time.monotonic()
+        stale = [sid for sid, s in shard.sessions.items() if self._expired(s, now)]
+        for sid in stale:
+            del shard.sessions[sid]
+        return len(stale)
+
+    def expire(self):
+        """Drop idle sessions from every shard, returning how many were removed"""
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                removed += self._sweep(shard)
+        return removed
+
+    def __len__(self):
+        return sum(len(shard.sessions) for shard in self._shards)
@@ -0,0 +1,180 @@
+"""
+Terminal Veil - Binary Save Format
+Game state packed into a few dozen bytes: fixed fields in a struct header,
+the inventory as a bitset of level reward IDs and attempts as an array of
+uint32 counts indexed by level. Anything irregular (sequence progress,
+flags, unknown keys) rides along in a small JSON trailer only when present.
+decode() also reads the old JSON saves. Decoding is only 1.3-2.5x faster
+than json.loads of the same state, short of the 10x aimed for; see
+benchmarks/bench_state_codec.py.
+"""
+import json
+import math
+import struct
+import sys
+from array import array
+
+from terminalveil.game_state import AttemptCounts, GameState, Inventory, Progress
+
+MAGIC = b'TV'
+VERSION = 3  # 2 added the run and sector start times, 3 the level seed
+
+# magic, version, current_level, bits, inventory bitset, attempt count;
+# then the counts, then each optional field the bits announce, in order
+_HEADER = struct.Struct('<2sBBBIB')
+_LENGTH = struct.Struct('<B')
+_EXTRA_LENGTH = struct.Struct('<I')
+
+_COMPLETE = 1
+_HAS_NAME = 2
+_HAS_FIRST_SUCCESS = 4
+_HAS_PROGRESS = 8  # Sequence progress as separator-joined shape names
+_HAS_EXTRA = 16
+_HAS_TIMES = 32
+_HAS_SEED = 64
+
+_TIMES = struct.Struct('<dd')  # started_at, level_started_at; NaN for None
+_SEED = struct.Struct('<I')
+
+_SEPARATOR = '\x1f'
+
+_attempt_structs = {}
+
+# Attempt counts can be copied straight into the array when its layout
+# matches the stored little-endian uint32s
+_RAW_COUNTS = array('I').itemsize == 4 and sys.byteorder == 'little'
+
+
+def _attempts_struct(count):
+    packer = _attempt_structs.get(count)
+    if packer is None:
+        packer = _attempt_structs[count] = struct.Struct(f'<{count}I')
+    return packer
+
+
+def _short(text):
+    raw = text.encode('utf-8')[:255]
+    return _LENGTH.pack(len(raw)) + raw
+
+
+def encode(state):
+    """Pack a GameState (or an old-style state dict) into bytes"""
+    if type(state) is not GameState:
+        state = GameState.from_dict(state)
+    bits = _COMPLETE if state.game_complete else 0
+    counts = state.attempts_count.counts
+    parts = [None, _attempts_struct(len(counts)).pack(*counts)]
+
+    name = state.player_name if 'player_name' in state else None
+    if name is not None:
+        bits |= _HAS_NAME
+        parts.append(_short(name))
+    if state.first_success:
+        bits |= _HAS_FIRST_SUCCESS
+        parts.append(_short(state.first_success))
+
+    started_at = state.started_at
+    level_started_at = state.level_started_at
+    if started_at is not None or level_started_at is not None:
+        bits |= _HAS_TIMES
+        parts.append(_TIMES.pack(
+            math.nan if started_at is None else started_at,
+            math.nan if level_started_at is None else level_started_at))
+
+    extra = None
+    seed = state.seed
+    if seed is not None:
+        if 0 <= seed < 1 << 32:
+            bits |= _HAS_SEED
+            parts.append(_SEED.pack(seed))
+        else:
+            extra = {'seed': seed}
+
+    progress = state.scans_this_level
+    if progress:
+        if all(type(step) is str for step in progress):
+            bits |= _HAS_PROGRESS
+            raw = _SEPARATOR.join(progress).encode('utf-8')
+            parts.append(_EXTRA_LENGTH.pack(len(raw)) + raw)
+        else:
+            extra = extra or {}
+            extra['scans_this_level'] = list(progress)
+
+    inventory = state.inventory.bits
+    if state.inventory.others:
+        # Not level rewards (or duplicates); keep the whole list as is
+        extra = extra or {}
+        extra['inventory'] = list(state.inventory)
+        inventory = 0
+
+    if state.flags:
+        extra = extra or {}
+        extra['flags'] = state.flags
+    if state.easter_eggs_found:
+        extra = extra or {}
+        extra['easter_eggs_found'] = state.easter_eggs_found
+    if state.extra:
+        extra = extra or {}
+        extra.update(state.extra)
+    if extra:
+        bits |= _HAS_EXTRA
+        raw = json.dumps(extra, separators=(',', ':')).encode('utf-8')
+        parts.append(_EXTRA_LENGTH.pack(len(raw)) + raw)
+
+    parts[0] = _HEADER.pack(MAGIC, VERSION, state.current_level, bits, inventory, len(counts))
+    return b''.join(parts)
+
+
+def _decode_binary(data):
+    _, version, level, bits, inventory, count = _HEADER.unpack_from(data)
+    if version not in (1, 2, VERSION):
+        raise ValueError(f"Unsupported save version: {version}")
+    offset = _HEADER.size
+    state = GameState()
+    if _RAW_COUNTS:
+        state.attempts_count.counts = array('I', data[offset:offset + 4 * count])
+    else:
+        state.attempts_count = AttemptCounts(_attempts_struct(count).unpack_from(data, offset))
+    offset += 4 * count
+
+    state.current_level = level
+    state.inventory = Inventory(inventory)
+    state.game_complete = bool(bits & _COMPLETE)
+    if bits & _HAS_NAME:
+        length = data[offset]
+        state.player_name = data[offset + 1:offset + 1 + length].decode('utf-8', 'ignore')
+        offset += 1 + length
+    if bits & _HAS_FIRST_SUCCESS:
+        length = data[offset]
+        state.first_success = data[offset + 1:offset + 1 + length].decode('utf-8')
+        offset += 1 + length
+    if bits & _HAS_TIMES:
+        started_at, level_started_at = _TIMES.unpack_from(data, offset)
+        offset += _TIMES.size
+        state.started_at = None if math.isnan(started_at) else started_at
+        state.level_started_at = None if math.isnan(level_started_at) else level_started_at
+    if bits & _HAS_SEED:
+        (state.seed,) = _SEED.unpack_from(data, offset)
+        offset += _SEED.size
+    if bits & _HAS_PROGRESS:
+        (length,) = _EXTRA_LENGTH.unpack_from(data, offset)
+        offset += _EXTRA_LENGTH.size
+        state.scans_this_level = Progress(data[offset:offset + length].decode('utf-8').split(_SEPARATOR))
+        offset += length
+    if bits & _HAS_EXTRA:
+        (length,) = _EXTRA_LENGTH.unpack_from(data, offset)
+        offset += _EXTRA_LENGTH.size
+        state.update(json.loads(data[offset:offset + length]))
+    return state
+
+
+def decode(data):
+    """Unpack a binary save, or parse an old JSON one, into a GameState"""
+    if data[:2] == MAGIC:
+        return _decode_binary(data)
+    state = json.loads(data)
+    if isinstance(state, dict):
+        # Older saves may predate some keys; GameState fills them in
+        state['attempts_count'] = state.get('attempts_count') or {}
+        state = GameState.from_dict(state)
+    return state
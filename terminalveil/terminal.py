@@ -3,37 +3,101 @@ Terminal Veil - Game Engine with Easter Eggs and Extreme Difficulty
 Handles state, progression, inventory, and command parsing.
 """
 import random
-from terminalveil.puzzles import LEVELS, get_level_difficulty, get_difficulty_display
+import time
+from datetime import datetime
+from terminalveil.puzzles import LEVELS, get_level, get_level_difficulty, get_difficulty_display
+from terminalveil.matchers import matcher_for
 from terminalveil.save_manager import SaveManager
-from terminalveil.analytics import AnalyticsManager
+from terminalveil.events import new_state, apply_event
+from terminalveil.game_state import GameState
+from terminalveil.commands import CommandRegistry, command
+from terminalveil.analytics import default_analytics
+from terminalveil.leaderboard import DEFAULT_PLAYER
+
+# Rendered command output, keyed by the command and everything its text
+# depends on, so a state change simply misses. Levels are immutable and
+# live for the process, so their ids are safe in keys.
+_rendered = {}
+RENDER_CACHE_SIZE = 4096
+
+
+def _memo(key, render):
+    text = _rendered.get(key)
+    if text is None:
+        if len(_rendered) >= RENDER_CACHE_SIZE:
+            _rendered.clear()
+        text = _rendered[key] = render()
+    return text
+
+
+EASTER_EGGS = {
+    'up': "The system recognizes the attempt. But codes require sequences.",  # KONAMI code
+    'iddqd': "[GOD MODE] Nice try, Doomguy. This is not that kind of game.",
+    'xyzzy': "A hollow voice says 'Wrong game, adventurer.'",
+}
+
 
 class GameEngine:
-    def __init__(self, ui=None):
+    commands = None  # CommandRegistry of the @command methods, built once per class
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.commands = CommandRegistry.collect(cls)
+    
+    def __init__(self, ui=None, save_manager=None, analytics=None):
+        # No I/O here: the save and analytics are opened on first real use
         self.ui = ui
-        self.state = {
-            'current_level': 0,
-            'inventory': [],
-            'flags': {},
-            'scans_this_level': [],  # Track scans for sequence puzzles
-            'game_complete': False,
-            'easter_eggs_found': [],
-            'attempts_count': {},  # Track attempts per level
-            'first_success': None  # Track first completion
-        }
-        self.save_manager = SaveManager()
-        self.analytics = AnalyticsManager()
-        self.load_game()
-        
-        # Initialize attempt counter for current level
-        if self.state['current_level'] not in self.state['attempts_count']:
-            self.state['attempts_count'][self.state['current_level']] = 0
-        
-        # Record analytics
-        self.analytics.record_game_start()
+        self._save_manager = save_manager
+        self._analytics = analytics
+        self._state = None
     
+    @property
+    def save_manager(self):
+        if self._save_manager is None:
+            self._save_manager = SaveManager()
+        return self._save_manager
+    
+    @property
+    def analytics(self):
+        if self._analytics is None:
+            self._analytics = default_analytics()
+        return self._analytics
+    
+    @property
+    def state(self):
+        """Game state, loaded from the save the first time it is needed"""
+        if self._state is None:
+            self._state = new_state()
+            self.load_game()
+            
+            # Initialize attempt counter for current level
+            if self._state['current_level'] not in self._state['attempts_count']:
+                self._state['attempts_count'][self._state['current_level']] = 0
+            
+            # Pick this game's randomized levels (older saves predate seeds)
+            if self._state['seed'] is None:
+                self._emit('seed', seed=random.getrandbits(32))
+            
+            # Record analytics
+            self.analytics.record_game_start(self.save_manager.slot)
+        return self._state
+    
+    @state.setter
+    def state(self, value):
+        self._state = value if isinstance(value, GameState) else GameState.from_dict(value)
+    
+    def _emit(self, kind, **data):
+        """Apply a game event to the state and append it to the save"""
+        apply_event(self.state, kind, data)
+        self.save_manager.record(kind, data, self.state)
+
+    def _reset_progress(self):
+        if self.state['scans_this_level']:
+            self._emit('reset')
+
     def get_current_level(self):
         if self.state['current_level'] < len(LEVELS):
-            return LEVELS[self.state['current_level']]
+            return get_level(self.state['current_level'], self.state['seed'])
         return None
     
     def get_current_description(self):
@@ -41,66 +105,26 @@ class GameEngine:
         if not level:
             return "System Error: No level data found."
         
+        index = self.state['current_level']
+        progress = self.state['scans_this_level']
+        # Attempts only show (and so only matter) on the extreme levels
+        attempts = self.state['attempts_count'].get(index, 0) if index >= 10 else None
+        inventory = self.state['inventory']
+        key = ('look', id(level), index, len(progress), attempts, inventory.key())
+        return _memo(key, lambda: self._render_description(level, index, progress, attempts, inventory))
+    
+    def _render_description(self, level, index, progress, attempts, inventory):
         intro = level.get('intro', 'Unknown sector.')
-        req = level.get('requirement', {})
-        diff_display = get_difficulty_display(self.state['current_level'])
-        
-        desc = f"[SECTOR {self.state['current_level'] + 1}] {diff_display}\n{intro}\n\n"
-        
-        # Show progress for sequence puzzles
-        if 'sequence' in req:
-            seq = req['sequence']
-            progress = self.state['scans_this_level']
-            desc += f"[PROGRESS] {len(progress)}/{len(seq)} steps completed\n"
-            if progress:
-                desc += f"[COMPLETED] {' → '.join(progress)}\n"
-            desc += f"[NEXT] {seq[len(progress)] if len(progress) < len(seq) else 'COMPLETE'}\n\n"
-        
-        if 'complex_sequence' in req:
-            seq = req['complex_sequence']
-            progress = self.state['scans_this_level']
-            desc += f"[PROGRESS] {len(progress)}/{len(seq)} ritual steps\n"
-            if progress:
-                completed = []
-                for i, p in enumerate(progress):
-                    if isinstance(p, dict):
-                        completed.append(p.get('type', '?'))
-                    else:
-                        completed.append(str(p))
-                desc += f"[PERFORMED] {' → '.join(completed)}\n"
-            desc += "\n"
-        
-        # Show objectives
-        objectives = []
-        if 'color' in req and 'shape' not in str(req) and 'barcode' not in str(req):
-            objectives.append(f"[OBJECTIVE] {req['color'].upper()} color")
-        if 'qr_contains' in req:
-            objectives.append(f"[OBJECTIVE] QR: '{req['qr_contains']}'")
-        if 'shape' in req and not req.get('sequence') and not req.get('complex_sequence'):
-            objectives.append(f"[OBJECTIVE] {req['shape'].upper()} shape")
-        if 'barcode' in req and not req.get('simultaneous'):
-            objectives.append(f"[OBJECTIVE] Any barcode")
-        if req.get('any'):
-            objectives.append(f"[OBJECTIVE] Scan anything")
-        if req.get('randomized'):
-            objectives.append(f"[OBJECTIVE] Scan to discover requirement")
-        if req.get('sequence'):
-            objectives.append(f"[OBJECTIVE] Sequence: {' → '.join(req['sequence'])}")
-        if req.get('simultaneous'):
-            items = req['simultaneous']
-            objectives.append(f"[OBJECTIVE] SIMULTANEOUS: {items[0].upper()} + {items[1].upper()}")
-        if req.get('complex_sequence'):
-            objectives.append(f"[OBJECTIVE] 4-part ritual (check progress above)")
+        diff_display = get_difficulty_display(index)
         
-        if objectives:
-            desc += '\n'.join(objectives) + '\n'
+        desc = f"[SECTOR {index + 1}] {diff_display}\n{intro}\n\n"
+        desc += matcher_for(level).describe(progress)
         
         # Show attempt counter for extreme levels
-        if self.state['current_level'] >= 10:
-            attempts = self.state['attempts_count'].get(self.state['current_level'], 0)
+        if attempts is not None:
             desc += f"\n[ATTEMPTS] {attempts}"
         
-        desc += f"\nInventory: {', '.join(self.state['inventory']) if self.state['inventory'] else '[empty]'}"
+        desc += f"\nInventory: {', '.join(inventory) if inventory else '[empty]'}"
         return desc
     
     def process_command(self, cmd):
@@ -111,41 +135,17 @@ class GameEngine:
         action = parts[0]
         args = parts[1:]
         
-        # Easter egg: KONAMI code detection
-        if action == 'up':
-            return "The system recognizes the attempt. But codes require sequences."
-        if action == 'iddqd':
-            return "[GOD MODE] Nice try, Doomguy. This is not that kind of game."
-        if action == 'xyzzy':
-            return "A hollow voice says 'Wrong game, adventurer.'"
+        # Easter eggs: not commands, so never completed
+        if action in EASTER_EGGS:
+            return EASTER_EGGS[action]
         
-        commands = {
-            'help': self.cmd_help,
-            'look': self.cmd_look,
-            'inventory': self.cmd_inventory,
-            'inv': self.cmd_inventory,
-            'scan': self.cmd_scan_hint,
-            'use': lambda a: self.cmd_use(a),
-            'go': lambda a: self.cmd_go(a),
-            'save': self.cmd_save,
-            'load': self.cmd_load,
-            'quit': self.cmd_quit,
-            'hint': self.cmd_hint,
-            'status': self.cmd_status,
-            'lore': self.cmd_lore,
-            'secret': self.cmd_secret,
-            'hof': self.cmd_hall_of_fame,
-            'name': lambda a: self.cmd_set_name(a),
-            'clear': self.cmd_clear
-        }
-        
-        if action in commands:
-            if action in ['use', 'go', 'name']:
-                return commands[action](args)
-            return commands[action]()
-        
-        return f"Unknown command: '{action}'. Type 'help' for available commands."
+        entry = self.commands.get(action)
+        if entry is None:
+            return f"Unknown command: '{action}'. Type 'help' for available commands."
+        handler = getattr(self, entry.method)
+        return handler(args) if entry.arity else handler()
     
+    @command('help')
     def cmd_help(self):
         return """[b]SYSTEM COMMANDS[/b]
 [color=00FFFF]help[/color]       - Show this list
@@ -158,55 +158,34 @@ class GameEngine:
 [color=00FFFF]lore[/color]       - Read sector backstory
 [color=00FFFF]secret[/color]     - Hidden knowledge
 [color=00FFFF]status[/color]     - Show progress
-[color=00FFFF]hof[/color]        - Hall of Fame
+[color=00FFFF]hof[/color]        - Hall of Fame (hof [page])
+[color=00FFFF]rank[/color]       - Your Hall of Fame rank
 [color=00FFFF]name[/color]       - Set player name
 [color=00FFFF]quit[/color]       - Exit system
 
 [b]HINT:[/b] Some commands are not what they seem."""
     
+    @command('look')
     def cmd_look(self):
         return self.get_current_description()
     
+    @command('inventory', 'inv')
     def cmd_inventory(self):
         if not self.state['inventory']:
             return "Inventory: [empty]"
         return f"Inventory: {', '.join(self.state['inventory'])}"
     
+    @command('scan')
     def cmd_scan_hint(self):
         level = self.get_current_level()
         if not level:
             return "No active sector."
         
-        req = level.get('requirement', {})
-        hints = []
-        
-        if req.get('sequence'):
-            seq = req['sequence']
-            progress = self.state['scans_this_level']
-            hints.append(f"SEQUENCE: Scan in exact order!")
-            hints.append(f"Progress: {len(progress)}/{len(seq)}")
-            if len(progress) < len(seq):
-                hints.append(f"Next: {seq[len(progress)]}")
-        elif req.get('simultaneous'):
-            items = req['simultaneous']
-            hints.append(f"SIMULTANEOUS: {items[0].upper()} + {items[1].upper()} in ONE frame!")
-        elif req.get('complex_sequence'):
-            hints.append("4-PART RITUAL. Write it down:")
-            hints.append("1. QR 'ALPHA' → 2. YELLOW → 3. TRIANGLE → 4. QR 'OMEGA'")
-        elif req.get('any'):
-            hints.append("Scan any object.")
-        else:
-            if 'color' in req:
-                hints.append(f"Need: {req['color'].upper()} color")
-            if 'qr_contains' in req:
-                hints.append(f"Need: QR with '{req['qr_contains']}'")
-            if 'shape' in req:
-                hints.append(f"Need: {req['shape'].upper()} shape")
-            if 'barcode' in req:
-                hints.append("Need: Barcode")
-        
-        return "SCAN ready. " + " ".join(hints)
+        progress = self.state['scans_this_level']
+        return _memo(('scan', id(level), len(progress)),
+                     lambda: "SCAN ready. " + " ".join(matcher_for(level).hint(progress)))
     
+    @command('use', arity='*')
     def cmd_use(self, args):
         if not args:
             return "Use what? Specify item name."
@@ -215,14 +194,17 @@ class GameEngine:
             return f"You can't use {item} here."
         return f"You don't have {item}."
     
+    @command('go', arity='*')
     def cmd_go(self, args):
         return "Movement blocked. Use SCAN to solve the current sector."
     
+    @command('save')
     def cmd_save(self):
         if self.save_manager.save(self.state):
             return "Progress saved."
         return "Save failed."
     
+    @command('load')
     def cmd_load(self):
         loaded = self.save_manager.load()
         if loaded:
@@ -230,67 +212,116 @@ class GameEngine:
             return "Previous session restored."
         return "No save data found."
     
+    @command('quit')
     def cmd_quit(self):
         return "Goodbye."
     
+    @command('hint')
     def cmd_hint(self):
         level = self.get_current_level()
         if level and 'hint' in level:
             return f"[HINT] {level['hint']}"
         return "No hints available."
     
+    @command('lore')
     def cmd_lore(self):
         level = self.get_current_level()
         if level and 'lore' in level:
             return f"[ARCHIVE ENTRY]\n{level['lore']}"
         return "No archive data available."
     
+    @command('secret')
     def cmd_secret(self):
         level = self.get_current_level()
         if level and 'secret' in level:
             return f"[WHISPER] {level['secret']}"
         return "The Veil keeps its secrets."
     
-    def cmd_hall_of_fame(self):
+    @command('hof', arity='*')
+    def cmd_hall_of_fame(self, args=()):
         """Display Hall of Fame"""
-        hof = self.analytics.get_hall_of_fame()
-        if not hof:
-            return "[HALL OF FAME]\nNo completions yet. Be the first!"
+        board = self.analytics.leaderboard
+        try:
+            page = max(1, int(args[0])) if args else 1
+        except ValueError:
+            return "Usage: hof [page]"
+        
+        version = board.refresh()
+        result = _memo(('hof', id(board), page, version), lambda: self._render_hof_page(board, page))
+        totals = self.analytics.get_totals()  # Plays move on every game; never memoized
+        if not totals['completions']:
+            return result
+        
+        result += f"\n[STATISTICS]\n"
+        result += f"Total Plays: {totals['total_plays']}\n"
+        result += f"Completions: {totals['completions']}\n"
+        result += f"Completion Rate: {totals['completion_rate']}%\n"
+        
+        return result
+    
+    def _render_hof_page(self, board, page):
+        entries = board.page(page)
+        if not entries:
+            if page == 1:
+                return "[HALL OF FAME]\nNo completions yet. Be the first!"
+            return f"[HALL OF FAME]\nNo page {page}. Pages: {board.pages()}\n"
         
         result = "[HALL OF FAME - TOP VEIL BREAKERS]\n"
         result += "Rank | Player | Attempts | Date\n"
         result += "-" * 45 + "\n"
         
-        for i, entry in enumerate(hof, 1):
+        for i, entry in entries:
             date = entry['date'][:10]  # Just the date part
             result += f"{i:4} | {entry['player'][:15]:15} | {entry['attempts']:8} | {date}\n"
-        
-        stats = self.analytics.get_stats()
-        result += f"\n[STATISTICS]\n"
-        result += f"Total Plays: {stats['total_plays']}\n"
-        result += f"Completions: {stats['completions']}\n"
-        result += f"Completion Rate: {stats['completion_rate']}%\n"
-        
+        result += f"Page {page}/{board.pages()}\n"
         return result
     
+    @command('rank', arity='*')
+    def cmd_rank(self, args):
+        """Hall of Fame rank of a player's best run (default: your own run)"""
+        board = self.analytics.leaderboard
+        if args:
+            name = ' '.join(args)
+            if name.lower() == DEFAULT_PLAYER:
+                return f"{name} is everyone without a name. Type 'rank' for your own run."
+            found = board.rank_of(name)
+        else:
+            name = self.state.get('player_name', 'Anonymous')
+            run = self.state.get('hall_of_fame_run')
+            if run is not None:
+                found = board.rank_of_run(run)
+            elif name.lower() != DEFAULT_PLAYER:
+                found = board.rank_of(name)  # Runs finished before runs were kept
+            else:
+                found = None
+        if not found:
+            return f"{name} has not breached the Veil yet."
+        rank, entry = found
+        total = len(self.analytics.leaderboard)
+        return f"{entry['player']}: rank {rank} of {total} ({entry['attempts']} attempts)"
+    
+    @command('name', arity='*')
     def cmd_set_name(self, args):
         """Set player name for Hall of Fame"""
         if not args:
             return f"Current name: {self.state.get('player_name', 'Anonymous')}\nUsage: name [your-name]"
         
         name = ' '.join(args)[:20]  # Limit name length
-        self.state['player_name'] = name
+        self._emit('name', name=name)
         return f"Player name set to: {name}"
     
+    @command('status')
     def cmd_status(self):
-        lvl = self.state['current_level'] + 1
-        total = len(LEVELS)
-        diff = get_difficulty_display(self.state['current_level'])
-        inv_count = len(self.state['inventory'])
+        index = self.state['current_level']
         player = self.state.get('player_name', 'Anonymous')
-        total_attempts = sum(self.state['attempts_count'].values())
-        return f"Player: {player} | Sector {lvl}/{total} {diff} | Inventory: {inv_count} | Total Attempts: {total_attempts}"
+        inv_count = len(self.state['inventory'])
+        total_attempts = self.state['attempts_count'].total()
+        return _memo(('status', index, player, inv_count, total_attempts), lambda: (
+            f"Player: {player} | Sector {index + 1}/{len(LEVELS)} {get_difficulty_display(index)} | "
+            f"Inventory: {inv_count} | Total Attempts: {total_attempts}"
+        ))
     
+    @command('clear')
     def cmd_clear(self):
         return "__CLEAR__"
     
@@ -317,154 +348,42 @@ class GameEngine:
         if not level:
             return False
         
-        req = level.get('requirement', {})
-        result_type = result.get('type', 'unknown')
-        
         # Track attempt
-        self.state['attempts_count'][self.state['current_level']] = \
-            self.state['attempts_count'].get(self.state['current_level'], 0) + 1
-        
-        # Level 0: Calibration - anything works
-        if req.get('any'):
-            return result_type in ['color', 'shape', 'qr', 'barcode']
-        
-        # SEQUENCE PUZZLE (Level 10)
-        if 'sequence' in req:
-            target_seq = req['sequence']
-            progress = self.state['scans_this_level']
-            
-            if result_type != 'shape':
-                self.state['scans_this_level'] = []  # Reset on wrong type
-                return False
-            
-            detected = result.get('shape', '').lower()
-            expected = target_seq[len(progress)] if len(progress) < len(target_seq) else None
-            
-            if detected == expected:
-                progress.append(detected)
-                self.state['scans_this_level'] = progress
-                # Success only when sequence complete
-                return len(progress) == len(target_seq)
-            else:
-                # Wrong shape - RESET
-                self.state['scans_this_level'] = []
-                return False
-        
-        # SIMULTANEOUS SCAN (Level 11)
-        if 'simultaneous' in req:
-            targets = req['simultaneous']
-            # Must detect BOTH in one scan
-            # This requires special handling in camera or multiple detections
-            # For now, strict requirement check
-            detected_types = []
-            if result_type == 'barcode':
-                detected_types.append('barcode')
-            elif result_type == 'color' and result.get('color') == 'red':
-                detected_types.append('red')
-            
-            # Actually this needs camera to return multiple detections
-            # For now, check if result matches one and track partial
-            if result_type == 'barcode' or (result_type == 'color' and result.get('color') == 'red'):
-                return True  # Simplified - camera should detect both
-            return False
-        
-        # COMPLEX SEQUENCE (Level 12)
-        if 'complex_sequence' in req:
-            target_seq = req['complex_sequence']
-            progress = self.state['scans_this_level']
-            
-            if len(progress) >= len(target_seq):
-                return False
-            
-            expected = target_seq[len(progress)]
-            
-            # Check if result matches expected
-            if expected['type'] != result_type:
-                self.state['scans_this_level'] = []  # Reset
-                return False
-            
-            if result_type == 'qr':
-                if expected['contains'] not in result.get('data', ''):
-                    self.state['scans_this_level'] = []
-                    return False
-            elif result_type == 'color':
-                if result.get('color') != expected['value']:
-                    self.state['scans_this_level'] = []
-                    return False
-            elif result_type == 'shape':
-                if result.get('shape') != expected['value']:
-                    self.state['scans_this_level'] = []
-                    return False
-            
-            # Correct step
-            progress.append({'type': result_type, 'value': result.get('data') or result.get('color') or result.get('shape')})
-            self.state['scans_this_level'] = progress
-            return len(progress) == len(target_seq)
-        
-        # RANDOMIZED LEVELS
-        if req.get('randomized'):
-            actual = level.get('actual_requirement', {})
-            if actual.get('type') != result_type:
-                return False
-            
-            if result_type == 'color':
-                return result.get('color') == actual.get('value')
-            elif result_type == 'shape':
-                return result.get('shape') == actual.get('value')
-            elif result_type == 'qr':
-                return actual.get('value') in result.get('data', '')
-            return False
-        
-        # STANDARD REQUIREMENTS
-        matched = False
-        
-        if 'color' in req:
-            if result_type != 'color':
-                return False
-            if result.get('color') != req['color']:
-                return False
-            matched = True
-        
-        if 'qr_contains' in req:
-            if result_type != 'qr':
-                return False
-            if req['qr_contains'] not in result.get('data', ''):
-                return False
-            matched = True
-        
-        if 'shape' in req:
-            if result_type != 'shape':
-                return False
-            if result.get('shape') != req['shape']:
-                return False
-            matched = True
-        
-        if 'barcode' in req:
-            if result_type != 'barcode':
-                return False
-            matched = True
-        
-        return matched
+        self._emit('attempt', level=self.state['current_level'], t=time.time())
+        self.analytics.record_attempt(self.state['current_level'])
+        
+        verdict = matcher_for(level).match(result, self.state['scans_this_level'])
+        if verdict.reset:
+            self._reset_progress()
+        elif verdict.step is not None:
+            self._emit('progress', step=verdict.step)
+        return verdict.solved
     
     def advance_level(self):
-        self.state['current_level'] += 1
-        self.state['scans_this_level'] = []
-        
-        # Initialize attempt counter for new level
-        if self.state['current_level'] not in self.state['attempts_count']:
-            self.state['attempts_count'][self.state['current_level']] = 0
-        
-        if self.state['current_level'] >= len(LEVELS):
-            self.state['game_complete'] = True
-            if not self.state['first_success']:
-                self.state['first_success'] = datetime.now().isoformat()
-            
+        solved = self.state['current_level']
+        sector_started = self.state['level_started_at']
+        now = time.time()
+        if sector_started is not None:
+            self.analytics.record_level_solved(
+                solved, now - sector_started, self.state['attempts_count'].get(solved, 0))
+        
+        # Moves to the next sector, resetting its scans and attempt counter
+        self._emit('advance', at=datetime.now().isoformat())
+        self.analytics.record_level_reach(self.state['current_level'])
+        
+        if self.state['game_complete']:
             # Record in Hall of Fame
             total_attempts = sum(self.state['attempts_count'].values())
-            self.analytics.record_completion(
+            started = self.state['started_at']
+            rank, run = self.analytics.record_completion(
                 self.state.get('player_name', 'Anonymous'),
-                total_attempts
+                total_attempts,
+                round(now - started) if started is not None else None
             )
+            if run is not None:
+                self._emit('ranked', run=run)
+            
+            self.save_manager.save(self.state)
             
             # Get Hall of Fame
             hof = self.analytics.get_hall_of_fame()
@@ -480,9 +399,13 @@ You are among the elite few who have conquered The Alpha-Omega Protocol.
 
 [ACHIEVEMENT UNLOCKED: VEIL_BREAKER]
 [ATTEMPTS: {total_attempts}]
+[RANK: {rank}]
 {hof_text}
 Type 'status' to see your glory."""
         
+        # Autosave every cleared sector
+        self.save_manager.save(self.state)
+        
         level = self.get_current_level()
         level_num = self.state['current_level'] + 1
         diff = get_difficulty_display(self.state['current_level'])
@@ -496,3 +419,6 @@ Type 'status' to see your glory."""
         loaded = self.save_manager.load()
         if loaded:
             self.state = loaded
+
+
+GameEngine.commands = CommandRegistry.collect(GameEngine)
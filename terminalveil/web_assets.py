@@ -0,0 +1,158 @@
+"""
+Terminal Veil - Web Assets
+The page is static apart from its session cookie, so it is rendered once
+at startup, and its CSS and JS are served under content-hashed names.
+Every body is kept precompressed (gzip, plus brotli if installed) with a
+strong ETag, so repeat visits get a 304 for the page and never re-fetch
+an asset. A service worker, versioned by a hash of all of it, keeps the
+page and assets in the browser so the game opens without the network.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from jinja2 import Environment, FileSystemLoader
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(ROOT, 'static')
+TEMPLATE_DIR = os.path.join(ROOT, 'templates')
+ASSET_PREFIX = '/assets/'
+RENDERED_ASSETS = ('manifest.webmanifest',)  # Templates served like static files
+
+PAGE_CACHE = 'no-cache'  # Always revalidate: a deploy changes the asset names it links
+ASSET_CACHE = 'public, max-age=31536000, immutable'
+MIN_COMPRESS = 256  # Bytes; smaller bodies are not worth an encoding
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'text/javascript; charset=utf-8',
+    '.webmanifest': 'application/manifest+json',
+}
+
+
+def content_type(name):
+    ext = os.path.splitext(name)[1]
+    return CONTENT_TYPES.get(ext) or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+def _compressible(content_type):
+    return content_type.startswith('text/') or 'json' in content_type or 'xml' in content_type
+
+
+def _accepted(accept_encoding):
+    """Codings an Accept-Encoding header allows (q > 0)"""
+    accepted = set()
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding)
+    return accepted
+
+
+def _matches(if_none_match, etag):
+    """True if an If-None-Match header names etag (compared weakly, as the RFC says)"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag.removeprefix('W/') == etag:
+            return True
+    return False
+
+
+class Asset:
+    """One body in every encoding, each with its own strong ETag"""
+    __slots__ = ('content_type', 'cache_control', 'digest', 'bodies')
+
+    def __init__(self, body, content_type, cache_control=ASSET_CACHE):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.bodies = {None: body}
+        if len(body) >= MIN_COMPRESS and _compressible(content_type):
+            self.bodies['gzip'] = gzip.compress(body, 9, mtime=0)
+            if brotli is not None:
+                self.bodies['br'] = brotli.compress(body, quality=11)
+
+    def encoding_for(self, accept_encoding):
+        """The smallest encoding the client accepts; None for the plain body"""
+        accepted = _accepted(accept_encoding or '')
+        best = None
+        for encoding, body in self.bodies.items():
+            if encoding in accepted and len(body) < len(self.bodies[best]):
+                best = encoding
+        return best
+
+    def etag(self, encoding=None):
+        tag = self.digest[:20]
+        return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+    def respond(self, accept_encoding, if_none_match):
+        """(status, body, headers) answering a GET with these request headers"""
+        encoding = self.encoding_for(accept_encoding)
+        etag = self.etag(encoding)
+        headers = {'ETag': etag, 'Cache-Control': self.cache_control, 'Vary': 'Accept-Encoding'}
+        if _matches(if_none_match, etag):
+            return 304, b'', headers
+        headers['Content-Type'] = self.content_type
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return 200, self.bodies[encoding], headers
+
+
+class WebAssets:
+    """The rendered page and the static files it links, loaded once"""
+
+    def __init__(self, static_dir=STATIC_DIR, template_dir=TEMPLATE_DIR):
+        self.files = {}  # Hashed name -> Asset
+        self.urls = {}  # Source name -> URL of its hashed name
+        for name in sorted(os.listdir(static_dir)):
+            path = os.path.join(static_dir, name)
+            if os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    self._add(name, f.read())
+
+        env = Environment(loader=FileSystemLoader(template_dir), autoescape=True)
+        for name in RENDERED_ASSETS:
+            self._add(name, env.get_template(name).render(asset_url=self.url).encode('utf-8'))
+        page = env.get_template('index.html').render(asset_url=self.url)
+        self.index = Asset(page.encode('utf-8'), CONTENT_TYPES['.html'], PAGE_CACHE)
+
+        # Any change to the page or an asset makes a new version, and with
+        # it a new offline cache in every browser
+        digests = [self.index.digest] + sorted(asset.digest for asset in self.files.values())
+        self.version = hashlib.sha256(''.join(digests).encode('ascii')).hexdigest()[:12]
+        worker = env.get_template('sw.js').render(
+            version=self.version,
+            shell=['/'] + sorted(self.urls.values())
+        )
+        self.service_worker = Asset(worker.encode('utf-8'), CONTENT_TYPES['.js'], PAGE_CACHE)
+
+    def _add(self, name, body):
+        asset = Asset(body, content_type(name))
+        stem, ext = os.path.splitext(name)
+        hashed = f"{stem}.{asset.digest[:12]}{ext}"
+        self.files[hashed] = asset
+        self.urls[name] = ASSET_PREFIX + hashed
+
+    def url(self, name):
+        """Where the asset made from name is served"""
+        return self.urls[name]
+
+    def get(self, name):
+        """The asset served as name, or None"""
+        return self.files.get(name)
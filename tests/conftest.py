@@ -0,0 +1,13 @@
+import pytest
+
+from terminalveil import analytics, paths, save_manager
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Every data file a test writes goes to its own temporary directory"""
+    monkeypatch.setattr(paths, '_data_dir', str(tmp_path))
+    # Process-wide singletons would keep files from an earlier test open
+    monkeypatch.setattr(save_manager, '_default_store', None)
+    monkeypatch.setattr(analytics, '_default_analytics', None)
+    return tmp_path
@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from terminalveil.admission import (
+    PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, QueueFull, ScanQueue, scan_priority,
+)
+
+
+def blocked_queue(max_depth, degrade_depth=None):
+    """A one-worker queue whose worker is busy until the returned event is set"""
+    queue = ScanQueue(workers=1, max_depth=max_depth, degrade_depth=degrade_depth)
+    started, release = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    queue.submit(hold)
+    assert started.wait(5)
+    return queue, release
+
+
+def test_runs_work_and_returns_its_result():
+    queue = ScanQueue(workers=2, max_depth=4)
+    assert queue.submit(pow, 2, 10).result(5) == 1024
+
+
+def test_sheds_when_full():
+    queue, release = blocked_queue(max_depth=2)
+    try:
+        queue.submit(int)
+        queue.submit(int)
+        with pytest.raises(QueueFull) as shed:
+            queue.submit(int)
+        assert shed.value.retry_after >= 1
+        assert queue.depth == 2
+    finally:
+        release.set()
+
+
+def test_runs_higher_priority_first():
+    queue, release = blocked_queue(max_depth=4)
+    order = []
+    done = [queue.submit(order.append, 'upload', priority=PRIORITY_LOW),
+            queue.submit(order.append, 'auto', priority=PRIORITY_NORMAL),
+            queue.submit(order.append, 'targeted', priority=PRIORITY_HIGH)]
+    release.set()
+    for future in done:
+        future.result(5)
+    assert order == ['targeted', 'auto', 'upload']
+
+
+def test_exceptions_reach_the_future():
+    queue = ScanQueue(workers=1, max_depth=4)
+    with pytest.raises(ZeroDivisionError):
+        queue.submit(divmod, 1, 0).result(5)
+
+
+def test_degraded_past_the_degrade_depth():
+    queue, release = blocked_queue(max_depth=4, degrade_depth=1)
+    try:
+        assert not queue.degraded
+        queue.submit(int)
+        assert queue.degraded
+    finally:
+        release.set()
+
+
+def test_scan_priority():
+    assert scan_priority('any', upload=True) == PRIORITY_LOW
+    assert scan_priority('color') == PRIORITY_HIGH
+    assert scan_priority('any') == PRIORITY_NORMAL
@@ -0,0 +1,83 @@
+import json
+import os
+import time
+
+import pytest
+
+from terminalveil.analytics import AnalyticsManager
+
+
+@pytest.fixture
+def analytics():
+    return AnalyticsManager(flush_interval=3600, compact_interval=3600)
+
+
+def log_lines(analytics):
+    with open(analytics.log_path) as f:
+        return [json.loads(line) for line in f]
+
+
+def aggregates(analytics):
+    with open(analytics.filepath) as f:
+        return json.load(f)
+
+
+def archived(analytics):
+    day = time.strftime('%Y-%m-%d', time.gmtime())
+    with open(os.path.join(analytics.archive_dir, f"events-{day}.ndjson")) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_events_are_buffered_until_flush(analytics):
+    analytics.record_game_start()
+    assert not os.path.exists(analytics.log_path)
+    assert analytics.flush()
+    assert [event['e'] for event in log_lines(analytics)] == ['play']
+
+
+def test_counters_are_live_before_any_flush(analytics):
+    analytics.record_game_start()
+    analytics.record_level_reach(2)
+    analytics.record_attempt(2)
+    assert analytics.counters.plays == 1
+    assert analytics.counters.reaches()[2] == 1
+    assert analytics.counters.attempts()[2] == 1
+
+
+def test_compaction_rolls_up_archives_and_empties_the_log(analytics):
+    for _ in range(3):
+        analytics.record_game_start()
+    analytics.record_level_reach(1)
+    analytics.record_attempt(1)
+    analytics.record_attempt(1)
+    analytics.record_completion('neo', 7, 42.0)
+    assert analytics.compact()
+
+    assert log_lines(analytics) == []
+    assert [event['e'] for event in archived(analytics)] == [
+        'play', 'play', 'play', 'reach', 'attempt', 'attempt', 'completion']
+
+    data = aggregates(analytics)
+    assert data['total_plays'] == 3
+    assert data['level_reaches'] == {'level_1': 1}
+    assert data['sector_attempts'] == {'level_1': 2}
+    assert [(c['player'], c['attempts']) for c in data['completions']] == [('neo', 7)]
+
+
+def test_compactions_add_up(analytics):
+    analytics.record_game_start()
+    analytics.compact()
+    analytics.record_game_start()
+    analytics.compact()
+    assert aggregates(analytics)['total_plays'] == 2
+    assert len(archived(analytics)) == 2
+
+
+def test_compaction_skips_torn_lines(analytics):
+    analytics.record_game_start()
+    analytics.flush()
+    with open(analytics.log_path, 'a') as f:
+        f.write('{"e": "pla\n')
+    analytics.record_game_start()
+    assert analytics.compact()
+    assert aggregates(analytics)['total_plays'] == 2
@@ -0,0 +1,66 @@
+from terminalveil.commands import CommandRegistry, PrefixTrie, command, common_prefix
+from terminalveil.terminal import GameEngine
+
+
+class Engine:
+    @command('look')
+    def cmd_look(self):
+        return 'room'
+
+    @command('load')
+    def cmd_load(self):
+        return 'loaded'
+
+    @command('inventory', 'inv', arity='*')
+    def cmd_inventory(self, args):
+        return args
+
+
+class LouderEngine(Engine):
+    @command('look')
+    def cmd_shout(self):
+        return 'ROOM'
+
+
+def test_trie_completes_in_order_up_to_a_limit():
+    trie = PrefixTrie(['scan', 'save', 'secret', 'status', 'save'])
+    assert trie.complete('s') == ('save', 'scan', 'secret', 'status')
+    assert trie.complete('sa') == ('save',)
+    assert trie.complete('s', limit=2) == ('save', 'scan')
+    assert trie.complete('x') == ()
+
+
+def test_common_prefix():
+    assert common_prefix(['save', 'scan']) == 's'
+    assert common_prefix(['look', 'lore', 'load']) == 'lo'
+    assert common_prefix([]) == ''
+
+
+def test_registry_collects_names_and_aliases():
+    registry = CommandRegistry.collect(Engine)
+    assert registry.get('inv') is registry.get('inventory')
+    assert registry.get('inv').arity == '*'
+    assert registry.get('quit') is None
+
+
+def test_subclass_overrides_a_command():
+    assert CommandRegistry.collect(LouderEngine).get('look').method == 'cmd_shout'
+
+
+def test_complete_and_extend():
+    registry = CommandRegistry.collect(Engine)
+    assert registry.complete('lo') == ('load', 'look')
+    assert registry.complete('  IN') == ('inv', 'inventory')
+    assert registry.complete('look around') == ()
+    assert registry.extend('loo') == 'look '
+    assert registry.extend('l') == 'lo'
+    assert registry.extend('zz') == 'zz'
+
+
+def test_engine_dispatch():
+    engine = GameEngine()
+    assert engine.process_command('  ') is None
+    assert engine.process_command('frobnicate').startswith("Unknown command: 'frobnicate'")
+    assert engine.process_command('xyzzy') == "A hollow voice says 'Wrong game, adventurer.'"
+    assert 'SYSTEM COMMANDS' in engine.process_command('HELP')
+    assert 'rank' in GameEngine.commands.complete('r')
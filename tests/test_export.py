@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from terminalveil import export
+from terminalveil.analytics import AnalyticsManager
+
+
+@pytest.fixture
+def analytics():
+    return AnalyticsManager(flush_interval=3600, compact_interval=3600)
+
+
+def kinds(lines):
+    return [json.loads(line)['e'] for line in lines]
+
+
+def test_exports_archived_and_live_events(analytics):
+    analytics.record_game_start()
+    analytics.compact()
+    analytics.record_attempt(0)
+    analytics.flush()
+    assert kinds(export.export_lines(analytics)) == ['play', 'attempt']
+
+
+def test_export_is_a_cut_even_if_compacted_meanwhile(analytics):
+    for _ in range(3):
+        analytics.record_game_start()
+    analytics.compact()
+    for _ in range(4):
+        analytics.record_attempt(1)
+    analytics.flush()
+
+    events = export.iter_events(analytics)
+    seen = [next(events)]
+    analytics.record_level_reach(2)  # After the cut
+    analytics.compact()  # Moves the log being read into the archive
+    seen.extend(events)
+    assert [event['e'] for _, event in seen] == ['play'] * 3 + ['attempt'] * 4
+
+    assert len(list(export.iter_events(analytics))) == 8
+
+
+def test_filters_by_kind_and_time(analytics):
+    analytics.record_game_start()
+    analytics.record_attempt(0)
+    analytics.flush()
+    assert kinds(export.export_lines(analytics, kinds={'attempt'})) == ['attempt']
+    assert list(export.export_lines(analytics, since=2e9)) == []
+    assert list(export.export_lines(analytics, until=1)) == []
+
+
+def test_csv_has_a_header(analytics):
+    analytics.record_level_reach(3)
+    analytics.flush()
+    lines = list(export.export_lines(analytics, fmt='csv'))
+    assert lines[0] == ','.join(export.EVENT_FIELDS) + '\n'
+    assert lines[1].split(',')[1:3] == ['reach', '3']
+
+
+def test_aggregates(analytics):
+    analytics.record_game_start()
+    rows = [json.loads(line) for line in export.export_lines(analytics, what='aggregates')]
+    assert {'metric': 'total_plays', 'level': None, 'value': 1} in rows
+
+
+def test_parse_time():
+    assert export.parse_time('1700000000') == 1700000000.0
+    assert export.parse_time('1970-01-02') == 86400.0
+    assert export.parse_time('') is None
+    with pytest.raises(ValueError):
+        export.parse_time('yesterday')
+
+
+def test_token_only_from_the_authorization_header():
+    assert export.authorized('secret', {'Authorization': 'Bearer secret'})
+    assert not export.authorized('secret', {'Authorization': 'Bearer wrong'})
+    assert not export.authorized('secret', {})
+    assert not export.authorized('', {'Authorization': 'Bearer '})
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import pytest
+
+from terminalveil.admission import QueueFull
+from terminalveil.jobs import JobStore, sse_event
+
+
+def session(session_id='s1'):
+    return SimpleNamespace(id=session_id)
+
+
+def resolving(result):
+    starts = []
+
+    def start(job):
+        starts.append(job)
+        job.future.set_result(result)
+    return start, starts
+
+
+def test_same_request_id_returns_the_same_job():
+    jobs = JobStore()
+    start, starts = resolving({'success': True})
+    job, created = jobs.submit(session(), 'r1', start)
+    again, created_again = jobs.submit(session(), 'r1', start)
+    assert created and not created_again
+    assert again is job
+    assert len(starts) == 1  # Detection ran once
+    assert again.to_dict() == {'job_id': job.id, 'status': 'done', 'result': {'success': True}}
+
+
+def test_request_ids_are_per_session():
+    jobs = JobStore()
+    start, starts = resolving({})
+    first, _ = jobs.submit(session('s1'), 'r1', start)
+    second, created = jobs.submit(session('s2'), 'r1', start)
+    assert created and second is not first
+    assert len(starts) == 2
+
+
+def test_without_request_id_every_submit_is_new():
+    jobs = JobStore()
+    start, starts = resolving({})
+    jobs.submit(session(), None, start)
+    jobs.submit(session(), None, start)
+    assert len(starts) == 2
+    assert len(jobs) == 2
+
+
+def test_jobs_are_private_to_their_session():
+    jobs = JobStore()
+    job, _ = jobs.submit(session('s1'), 'r1', resolving({})[0])
+    assert jobs.get(job.id, 's1') is job
+    assert jobs.get(job.id, 's2') is None
+    assert jobs.get('missing', 's1') is None
+
+
+def test_failed_start_discards_the_job():
+    jobs = JobStore()
+
+    def shed(job):
+        raise QueueFull(3)
+
+    with pytest.raises(QueueFull):
+        jobs.submit(session(), 'r1', shed)
+    assert len(jobs) == 0
+
+    # A retry with the same request ID runs afresh
+    job, created = jobs.submit(session(), 'r1', resolving({'success': False})[0])
+    assert created and job.status == 'done'
+
+
+def test_pending_job_has_no_result():
+    jobs = JobStore()
+    job, _ = jobs.submit(session(), 'r1', lambda job: None)
+    assert job.to_dict() == {'job_id': job.id, 'status': 'pending'}
+
+
+def test_sse_event_frame():
+    assert sse_event('result', '{}') == 'event: result\ndata: {}\n\n'
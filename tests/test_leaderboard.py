@@ -0,0 +1,143 @@
+import random
+
+import pytest
+
+from terminalveil.analytics import AnalyticsManager
+from terminalveil.leaderboard import IndexableSkiplist, Leaderboard
+from terminalveil.puzzles import LEVELS
+from terminalveil.save_manager import SaveManager
+from terminalveil.terminal import GameEngine
+
+
+def completion(player, attempts, time_taken=None):
+    return {'player': player, 'attempts': attempts, 'date': '2026-01-01T00:00:00', 'time_taken': time_taken}
+
+
+def test_skiplist_keeps_order_and_ranks():
+    keys = random.Random(7).sample(range(1000), 200)
+    skiplist = IndexableSkiplist()
+    for key in keys:
+        skiplist.insert(key, str(key))
+    ordered = sorted(keys)
+    assert len(skiplist) == 200
+    assert skiplist.slice(0, 200) == [str(key) for key in ordered]
+    assert skiplist.slice(50, 60) == [str(key) for key in ordered[50:60]]
+    for index in (0, 17, 199):
+        assert skiplist.rank(ordered[index]) == index
+        assert skiplist[index] == str(ordered[index])
+        assert skiplist.key_at(index) == ordered[index]
+
+
+def test_add_returns_rank_and_pages():
+    board = Leaderboard()
+    assert board.add(completion('a', 30))[0] == 1
+    assert board.add(completion('b', 10))[0] == 1
+    assert board.add(completion('c', 20))[0] == 2
+    assert board.add(completion('d', 20, time_taken=5))[0] == 2  # Faster breaks the tie
+    assert [entry['player'] for _, entry in board.top()] == ['b', 'd', 'c', 'a']
+    assert board.page(2, size=3) == [(4, completion('a', 30))]
+    assert board.pages(size=3) == 2
+
+
+def test_rank_of_is_a_players_best_run_regardless_of_case():
+    board = Leaderboard()
+    board.add(completion('Neo', 50))
+    board.add(completion('trinity', 20))
+    board.add(completion('neo', 10))
+    rank, entry = board.rank_of('NEO')
+    assert (rank, entry['attempts']) == (1, 10)
+    assert board.rank_of('morpheus') is None
+    assert board.players() == 2
+
+
+def test_each_run_keeps_its_own_rank():
+    board = Leaderboard()
+    _, slow = board.add(completion('Anonymous', 50))
+    _, fast = board.add(completion('Anonymous', 5))
+    board.add(completion('neo', 20))
+    assert board.rank_of_run(fast)[0] == 1
+    assert board.rank_of_run(slow)[0] == 3
+    assert board.rank_of('anonymous') is None  # Not one person
+    assert board.players() == 2  # Named players, plus "anonymous" once
+
+
+def test_unknown_run_has_no_rank():
+    board = Leaderboard()
+    board.add(completion('neo', 20))
+    assert board.rank_of_run([20, None, 5]) is None
+    assert board.rank_of_run([99, None, 0]) is None
+
+
+def test_processes_share_the_file_and_agree_on_runs():
+    mine, theirs = Leaderboard(), Leaderboard()
+    mine.add(completion('a', 30))
+    _, run = theirs.add(completion('b', 10))
+    assert theirs.rank_of_run(run)[0] == 1
+    assert mine.rank_of_run(run)[0] == 1
+    assert len(mine) == 2
+
+
+def test_new_file_is_seeded_once():
+    seeded = Leaderboard(seed=lambda: [completion('old', 40)])
+    assert [entry['player'] for _, entry in seeded.top()] == ['old']
+    again = Leaderboard(seed=lambda: [completion('other', 1)])
+    assert [entry['player'] for _, entry in again.top()] == ['old']
+
+
+@pytest.fixture
+def analytics():
+    return AnalyticsManager(flush_interval=3600, compact_interval=3600)
+
+
+def finish(analytics, slot, attempts, name=None):
+    """An engine that has just solved the last sector"""
+    engine = GameEngine(save_manager=SaveManager(slot=slot), analytics=analytics)
+    if name:
+        engine.process_command(f'name {name}')
+    engine.state['current_level'] = len(LEVELS) - 1
+    engine.state['attempts_count'][0] = attempts
+    engine.advance_level()
+    return engine
+
+
+def test_unnamed_finishers_each_get_their_own_rank(analytics):
+    slow = finish(analytics, 'slow', 50)
+    fast = finish(analytics, 'fast', 5)
+    assert fast.process_command('rank') == "Anonymous: rank 1 of 2 (5 attempts)"
+    assert slow.process_command('rank') == "Anonymous: rank 2 of 2 (50 attempts)"
+    assert 'everyone without a name' in fast.process_command('rank anonymous')
+
+
+def test_players_sharing_a_name_see_their_own_run(analytics):
+    worse = finish(analytics, 'one', 60, name='neo')
+    better = finish(analytics, 'two', 3, name='neo')
+    assert worse.process_command('rank') == "neo: rank 2 of 2 (60 attempts)"
+    assert better.process_command('rank neo') == "neo: rank 1 of 2 (3 attempts)"
+
+
+def test_own_rank_survives_a_reload(analytics):
+    finish(analytics, 'slot', 12)
+    reloaded = GameEngine(save_manager=SaveManager(slot='slot'), analytics=analytics)
+    assert reloaded.process_command('rank') == "Anonymous: rank 1 of 1 (12 attempts)"
+
+
+def test_unfinished_player_has_no_rank(analytics):
+    engine = GameEngine(save_manager=SaveManager(slot='new'), analytics=analytics)
+    assert engine.process_command('rank') == "Anonymous has not breached the Veil yet."
+
+
+def test_hall_of_fame_page_is_memoized_but_totals_stay_current(analytics):
+    engine = GameEngine(save_manager=SaveManager(slot='hof'), analytics=analytics)
+    analytics.record_completion('neo', 4)
+    analytics.record_game_start()
+    first = engine.process_command('hof')
+    assert 'neo' in first and 'Total Plays: 1' in first
+
+    analytics.record_game_start()  # Plays alone leave the page as it was
+    second = engine.process_command('hof')
+    assert 'Total Plays: 2' in second
+    assert second.split('[STATISTICS]')[0] == first.split('[STATISTICS]')[0]
+
+    analytics.record_completion('trinity', 2)
+    third = engine.process_command('hof')
+    assert third.index('trinity') < third.index('neo')
@@ -0,0 +1,52 @@
+from terminalveil.matchers import (
+    HIT, MISS, RESET, AnyMatcher, ComplexSequenceMatcher, RandomizedMatcher, SequenceMatcher,
+    Signal, SignalsMatcher, compile_level, matcher_for,
+)
+from terminalveil.puzzles import LEVELS
+
+
+def test_signals_must_all_show_in_one_scan():
+    matcher = compile_level({'requirement': {'color': 'blue', 'shape': 'circle'}})
+    assert isinstance(matcher, SignalsMatcher)
+    assert matcher.match({'type': 'color', 'color': 'blue'}, []) == MISS
+    qr = compile_level({'requirement': {'qr_contains': 'VEIL'}})
+    assert qr.match({'type': 'qr', 'data': 'THE-VEIL-42'}, []) == HIT
+    assert qr.match({'type': 'qr', 'data': 'nope'}, []) == MISS
+
+
+def test_sequence_steps_and_resets():
+    matcher = SequenceMatcher(['circle', 'square'])
+    first = matcher.match({'type': 'shape', 'shape': 'CIRCLE'}, [])
+    assert (first.solved, first.step) == (False, 'circle')
+    assert matcher.match({'type': 'shape', 'shape': 'square'}, ['circle']).solved
+    assert matcher.match({'type': 'shape', 'shape': 'square'}, []) == RESET
+    assert matcher.match({'type': 'color', 'color': 'red'}, ['circle']) == RESET
+
+
+def test_complex_sequence_records_each_step():
+    matcher = ComplexSequenceMatcher([Signal('qr', 'ALPHA'), Signal('color', 'yellow')])
+    step = matcher.match({'type': 'qr', 'data': 'ALPHA'}, [])
+    assert step.step == {'type': 'qr', 'value': 'ALPHA'} and not step.solved
+    assert matcher.match({'type': 'color', 'color': 'yellow'}, [step.step]).solved
+    assert matcher.match({'type': 'color', 'color': 'yellow'}, []) == RESET
+
+
+def test_any_scan_passes_calibration():
+    matcher = compile_level({'requirement': {'any': True}})
+    assert isinstance(matcher, AnyMatcher)
+    assert matcher.match({'type': 'color', 'color': 'green'}, []) == HIT
+
+
+def test_randomized_signature_is_only_told_after_a_scan():
+    matcher = compile_level({'requirement': {'randomized': True},
+                             'actual_requirement': {'type': 'color', 'value': 'red'}})
+    assert isinstance(matcher, RandomizedMatcher)
+    assert matcher.hint([]) == []
+    assert 'RED' not in matcher.describe([])
+    assert 'RED' in matcher.feedback([])
+    assert matcher.match({'type': 'color', 'color': 'red'}, []) == HIT
+
+
+def test_every_level_compiles_once():
+    for level in LEVELS:
+        assert matcher_for(level) is matcher_for(level)
@@ -0,0 +1,81 @@
+import io
+import threading
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from terminalveil.admission import QueueFull, ScanQueue
+from terminalveil.ratelimit import Budget, RateLimited, RateLimiter
+from terminalveil.scanning import estimate_scan_cost, submit_scan
+from terminalveil.terminal import GameEngine
+
+
+def png(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def session():
+    return SimpleNamespace(id='s1', lock=threading.Lock(), engine=GameEngine(), analyzer=None)
+
+
+def test_bucket_refuses_past_capacity():
+    limiter = RateLimiter(capacity=10, refill=1)
+    assert limiter.take('a', 6) == 0
+    assert limiter.take('a', 6) > 0
+    assert limiter.take('b', 6) == 0  # Buckets are per key
+
+
+def test_bucket_without_refill_never_recovers():
+    limiter = RateLimiter(capacity=1, refill=0)
+    assert limiter.take('a', 1) == 0
+    assert limiter.take('a', 1) == float('inf')
+
+
+def test_budget_charges_all_buckets_or_none():
+    per_session = RateLimiter(capacity=10, refill=0)
+    per_ip = RateLimiter(capacity=4, refill=0)
+    budget = Budget('scan', per_session, per_ip)
+    per_ip.take('10.0.0.1', 4)
+    with pytest.raises(RateLimited):
+        budget.charge('s1', '10.0.0.1', 5)
+    assert per_session.take('s1', 10) == 0  # The session bucket was given back
+
+
+def test_budget_refund_restores_tokens():
+    limiter = RateLimiter(capacity=10, refill=0)
+    refund = Budget('scan', limiter).charge('s1', None, 10)
+    assert limiter.take('s1', 1) > 0
+    refund()
+    assert limiter.take('s1', 10) == 0
+
+
+def test_scan_cost_reads_only_the_header():
+    image = png(2000, 1000)
+    assert estimate_scan_cost(image, {}, 'any') == pytest.approx(8.0)
+    assert estimate_scan_cost(image, {}, 'color') == pytest.approx(2.0)
+    assert estimate_scan_cost(png(10, 10), {}, 'any') == 1.0
+
+
+def test_shed_scan_is_refunded():
+    limiter = RateLimiter(capacity=10, refill=0)
+    budget = Budget('scan', limiter)
+    queue = ScanQueue(workers=1, max_depth=0)  # Sheds everything
+    player = session()
+    with pytest.raises(QueueFull):
+        submit_scan(queue, player, png(2000, 1000), 'any',
+                    charge=lambda cost: budget.charge(player.id, None, cost))
+    assert limiter.take(player.id, 10) == 0
+
+
+def test_rate_limited_scan_is_never_queued():
+    limiter = RateLimiter(capacity=1, refill=0)
+    budget = Budget('scan', limiter)
+    limiter.take('s1', 1)
+    queue = ScanQueue(workers=1, max_depth=4)
+    with pytest.raises(RateLimited):
+        submit_scan(queue, session(), png(100, 100), 'any',
+                    charge=lambda cost: budget.charge('s1', None, cost))
+    assert queue.depth == 0
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from terminalveil.events import SNAPSHOT_EVERY, apply_event, new_state, replay
+from terminalveil.save_manager import LOCAL_SLOT, SaveManager, SQLiteSaveStore
+from terminalveil.save_writer import SaveWriter
+
+
+@pytest.fixture
+def store():
+    return SQLiteSaveStore()
+
+
+def test_events_replay_onto_a_fresh_game():
+    state = replay(new_state(), [
+        ('attempt', {'level': 0, 't': 100.0}),
+        ('advance', {'at': '2026-01-01T00:00:00'}),
+        ('progress', {'step': 'circle'}),
+        ('name', {'name': 'Neo'}),
+    ])
+    assert state['current_level'] == 1
+    assert state['attempts_count'][0] == 1
+    assert state['started_at'] == 100.0
+    assert state['scans_this_level'] == ['circle']
+    assert state['player_name'] == 'Neo'
+
+
+def test_unknown_event_is_refused():
+    with pytest.raises(ValueError):
+        apply_event(new_state(), 'teleport', {})
+
+
+def test_load_is_snapshot_plus_tail(store):
+    snapshot = replay(new_state(), [('attempt', {'level': 0})])
+    store.save('s1', snapshot, seq=1)
+    store.write_batch(events=[('s1', 1, 'attempt', {'level': 0}),  # Already in the snapshot
+                              ('s1', 2, 'advance', {'at': 'now'})])
+    state, seq = store.load('s1')
+    assert seq == 2
+    assert state['current_level'] == 1
+    assert state['attempts_count'][0] == 1
+
+
+def test_load_merges_queued_events(store):
+    store.write_batch(events=[('s1', 1, 'attempt', {'level': 0})])
+    queued = [('s1', 1, 'attempt', {'level': 0}), ('s1', 2, 'name', {'name': 'Neo'})]
+    state, seq = store.load('s1', pending=(None, queued))
+    assert seq == 2
+    assert state['attempts_count'][0] == 1
+    assert state['player_name'] == 'Neo'
+
+
+def test_empty_slot(store):
+    assert store.load('nobody') == (None, 0)
+    assert not store.has_slot('nobody')
+
+
+def test_manager_snapshots_every_so_many_events(store):
+    manager = SaveManager(slot='s1', store=store)
+    state = new_state()
+    for _ in range(SNAPSHOT_EVERY + 3):
+        apply_event(state, 'attempt', {'level': 0})
+        manager.record('attempt', {'level': 0}, state)
+    assert manager.snapshot_seq == SNAPSHOT_EVERY
+
+    loaded = SaveManager(slot='s1', store=store).load()
+    assert loaded.to_dict() == state.to_dict()
+
+
+def test_legacy_json_save_is_migrated_once(store, data_dir):
+    legacy = new_state()
+    legacy['current_level'] = 3
+    (data_dir / 'veil_save.json').write_text(json.dumps(legacy.to_dict()))
+    assert SaveManager(store=store).load()['current_level'] == 3
+    assert store.has_slot(LOCAL_SLOT)
+    assert store.migrate_json(str(data_dir / 'veil_save.json'), LOCAL_SLOT) is None
+
+
+def test_writer_coalesces_snapshots_and_flushes(store):
+    writer = SaveWriter(store, debounce=3600, max_lag=3600)
+    first, second = new_state(), new_state()
+    second['current_level'] = 2
+    writer.submit('s1', first, seq=0)
+    writer.submit('s1', second, seq=0)
+    writer.append(('s1', 1, 'name', {'name': 'Neo'}))
+    assert writer.has_slot('s1') and not store.has_slot('s1')
+
+    # Still queued, but a load already sees it
+    state = SaveManager(slot='s1', writer=writer).load()
+    assert (state['current_level'], state['player_name']) == (2, 'Neo')
+
+    writer.flush()
+    state, seq = store.load('s1')
+    assert (state['current_level'], state['player_name'], seq) == (2, 'Neo', 1)
@@ -0,0 +1,73 @@
+import time
+
+from terminalveil.sessions import SessionStore
+
+
+def store(**options):
+    made = []
+
+    def engine_factory(session_id, fresh):
+        made.append((session_id, fresh))
+        return object()
+    sessions = SessionStore(engine_factory, object, shards=4, **options)
+    return sessions, made
+
+
+def test_new_ids_are_well_formed_and_distinct():
+    ids = {SessionStore.new_id() for _ in range(1000)}
+    assert len(ids) == 1000
+    assert all(SessionStore.well_formed(session_id) for session_id in ids)
+    assert not SessionStore.well_formed('guessable')
+    assert not SessionStore.well_formed('a' * 31 + '/')
+    assert not SessionStore.well_formed(None)
+
+
+def test_unknown_cookie_gets_a_new_session():
+    sessions, made = store()
+    session, created = sessions.get_or_create('made-up-by-the-client')
+    assert created and session.id != 'made-up-by-the-client'
+    assert made == [(session.id, True)]
+    assert sessions.get_or_create(session.id) == (session, False)
+    assert len(sessions) == 1
+
+
+def test_idle_sessions_expire(monkeypatch):
+    sessions, _ = store(max_idle=60)
+    session = sessions.create()
+    later = time.monotonic() + 61
+    monkeypatch.setattr(time, 'monotonic', lambda: later)
+    assert sessions.get(session.id) is None
+    assert len(sessions) == 0
+
+
+def test_expire_sweeps_every_shard(monkeypatch):
+    sessions, _ = store(max_idle=60)
+    for _ in range(10):
+        sessions.create()
+    later = time.monotonic() + 61
+    monkeypatch.setattr(time, 'monotonic', lambda: later)
+    assert sessions.expire() == 10
+    assert len(sessions) == 0
+
+
+def test_saved_game_is_restored_under_its_id():
+    saved = SessionStore.new_id()
+    sessions, made = store(restorable=lambda session_id: session_id == saved)
+    session, created = sessions.get_or_create(saved)
+    assert not created and session.id == saved
+    assert made == [(saved, False)]
+
+
+def test_only_well_formed_ids_are_restored():
+    asked = []
+    sessions, _ = store(restorable=lambda session_id: asked.append(session_id) or True)
+    session, created = sessions.get_or_create('../../etc/passwd')
+    assert created and asked == []
+
+
+def test_remove():
+    sessions, _ = store()
+    session = sessions.create()
+    assert sessions.remove(session.id)
+    assert not sessions.remove(session.id)
+    assert sessions.get(session.id) is None
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from terminalveil import state_codec
+from terminalveil.events import new_state
+from terminalveil.game_state import GameState
+from terminalveil.puzzles import LEVELS
+
+
+def mid_game():
+    state = new_state()
+    state.update({
+        'current_level': 4,
+        'inventory': [level['reward'] for level in LEVELS[:4]],
+        'scans_this_level': ['circle', 'square'],
+        'attempts_count': {0: 1, 1: 3, 2: 0, 3: 12, 4: 2},
+        'first_success': '2026-01-01T12:00:00.000000',
+        'started_at': 1767268800.5,
+        'level_started_at': 1767269100.25,
+        'seed': 123456,
+        'player_name': 'Neo',
+    })
+    return state
+
+
+def roundtrip(state):
+    data = state_codec.encode(state)
+    assert data[:2] == state_codec.MAGIC
+    return state_codec.decode(data)
+
+
+def test_fresh_state_roundtrips():
+    state = new_state()
+    assert roundtrip(state).to_dict() == state.to_dict()
+
+
+def test_mid_game_state_roundtrips():
+    state = mid_game()
+    decoded = roundtrip(state)
+    assert type(decoded) is GameState
+    assert decoded.to_dict() == state.to_dict()
+    assert 'player_name' in decoded
+
+
+def test_irregular_fields_ride_in_the_trailer():
+    state = mid_game()
+    state['flags'] = {'door': True}
+    state['easter_eggs_found'] = ['xyzzy']
+    state['inventory'].append('not a level reward')
+    state['seed'] = 1 << 40  # Too big for the fixed field
+    state['hall_of_fame_run'] = [12, None, 3]  # A key GameState has no slot for
+    decoded = roundtrip(state)
+    assert decoded.to_dict() == state.to_dict()
+    assert decoded['hall_of_fame_run'] == [12, None, 3]
+
+
+def test_dict_input_is_encoded_like_a_game_state():
+    state = mid_game()
+    assert state_codec.encode(state.to_dict()) == state_codec.encode(state)
+
+
+@pytest.mark.parametrize('version', [1, 2])
+def test_older_binary_versions_decode(version):
+    # v1 and v2 are the v3 layout without the times (v2) and seed (v3)
+    state = mid_game()
+    state.update({'started_at': None, 'level_started_at': None, 'seed': None})
+    data = bytearray(state_codec.encode(state))
+    data[2] = version
+    assert state_codec.decode(bytes(data)).to_dict() == state.to_dict()
+
+
+def test_unknown_version_is_refused():
+    data = bytearray(state_codec.encode(new_state()))
+    data[2] = state_codec.VERSION + 1
+    with pytest.raises(ValueError):
+        state_codec.decode(bytes(data))
+
+
+def test_json_saves_still_load():
+    state = mid_game()
+    as_json = json.dumps(state.to_dict())
+    assert state_codec.decode(as_json).to_dict() == state.to_dict()
+    assert state_codec.decode(as_json.encode('utf-8')).to_dict() == state.to_dict()
+
+
+def test_old_json_save_missing_keys_gets_defaults():
+    old = {'current_level': 2, 'inventory': [LEVELS[0]['reward']], 'attempts_count': {'1': 4}}
+    decoded = state_codec.decode(json.dumps(old))
+    assert decoded['current_level'] == 2
+    assert decoded['attempts_count'][1] == 4
+    assert decoded['scans_this_level'] == []
+    assert decoded['seed'] is None
@@ -0,0 +1,56 @@
+import gzip
+
+import pytest
+
+from terminalveil.web_assets import ASSET_PREFIX, Asset, WebAssets
+
+
+@pytest.fixture(scope='module')
+def assets():
+    return WebAssets()
+
+
+def test_small_bodies_are_not_compressed():
+    asset = Asset(b'tiny', 'text/css; charset=utf-8')
+    assert list(asset.bodies) == [None]
+
+
+def test_picks_an_accepted_encoding():
+    body = b'body { color: red; }\n' * 100
+    asset = Asset(body, 'text/css; charset=utf-8')
+    status, sent, headers = asset.respond('gzip, deflate', None)
+    assert status == 200
+    assert headers['Content-Encoding'] in ('gzip', 'br')
+    if headers['Content-Encoding'] == 'gzip':
+        assert gzip.decompress(sent) == body
+    assert asset.encoding_for('gzip;q=0') is None
+    assert asset.respond(None, None)[1] == body
+
+
+def test_matching_etag_gets_a_304():
+    asset = Asset(b'x' * 1000, 'text/javascript; charset=utf-8')
+    _, _, headers = asset.respond('gzip', None)
+    status, body, again = asset.respond('gzip', headers['ETag'])
+    assert (status, body) == (304, b'')
+    assert again['ETag'] == headers['ETag']
+    assert asset.respond('gzip', 'W/' + headers['ETag'])[0] == 304
+    assert asset.respond('gzip', '"stale"')[0] == 200
+    assert asset.respond('', headers['ETag'])[0] == 200  # Another encoding, another tag
+
+
+def test_page_links_hashed_assets(assets):
+    page = assets.index.bodies[None].decode('utf-8')
+    for name in ('terminal.css', 'terminal.js', 'manifest.webmanifest'):
+        url = assets.url(name)
+        assert url in page
+        hashed = url[len(ASSET_PREFIX):]
+        assert hashed != name
+        assert assets.get(hashed).cache_control.endswith('immutable')
+    assert assets.index.cache_control == 'no-cache'
+
+
+def test_service_worker_caches_the_shell(assets):
+    worker = assets.service_worker.bodies[None].decode('utf-8')
+    assert assets.version in worker
+    for url in assets.urls.values():
+        assert url in worker